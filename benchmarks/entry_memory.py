@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Memory benchmark for PronDictEntry: creates one entry per line of a dictionary file, like
+compound_analysis.process_dictionary() does, and reports the allocated bytes per entry for the
+eager entry class (all collections created in __init__, as before the introduction of __slots__)
+and for the current PronDictEntry.
+
+Usage:
+
+    PYTHONPATH=. python3 benchmarks/entry_memory.py [data/08_final_version/IPD_IPA_clean.csv]
+
+"""
+
+import sys
+import tracemalloc
+
+from pron_dict.entry import PronDictEntry
+
+IPD_FILE = 'data/08_final_version/IPD_IPA_clean.csv'
+
+
+class EagerPronDictEntry:
+    """
+    Replica of the attributes of PronDictEntry before __slots__ and lazy fields
+    """
+
+    def __init__(self, word='', transcription=''):
+        self.word = word
+        self.transcript = transcription.strip()
+        self.transcription_arr = self.transcript.split()
+        self.transcript_variants = set()
+        self.transcript_variants.add(self.transcript)
+        self.gpos = 'nil'
+        self.syllables = []
+        self.compound_elements = []
+        self.entailing_compounds = []
+        self.frequency = 0
+
+
+def read_dictionary(filename):
+    pairs = []
+    with open(filename) as f:
+        for line in f:
+            if line.strip():
+                word, transcr = line.rstrip('\n').split('\t')[:2]
+                pairs.append((word, transcr))
+    return pairs
+
+
+def measure(entry_class, pairs):
+    """
+    :return: the number of bytes allocated for the entries of pairs, the strings of pairs are not counted
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    entries = [entry_class(word, transcr) for word, transcr in pairs]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del entries
+    return after - before
+
+
+def main():
+    filename = sys.argv[1] if len(sys.argv) > 1 else IPD_FILE
+    pairs = read_dictionary(filename)
+    print('Entries: ' + str(len(pairs)))
+    eager = measure(EagerPronDictEntry, pairs)
+    compact = measure(PronDictEntry, pairs)
+    print('eager PronDictEntry:\t' + str(eager // len(pairs)) + ' bytes per entry')
+    print('slotted PronDictEntry:\t' + str(compact // len(pairs)) + ' bytes per entry')
+    print('reduction:\t\t' + '{:.1%}'.format(1 - compact / eager))
+
+
+if __name__ == '__main__':
+    main()
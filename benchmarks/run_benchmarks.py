@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmarks for the processing steps of the IPD pipeline.
+
+Each entry point is run on the input of its processing step (data/0*), and on synthetic scale-ups of that input.
+For each run the wall time, CPU time and the peak of memory allocated (tracemalloc) are recorded. Timing and
+memory are measured in separate runs, since tracemalloc slows down the code considerably.
+
+The scaled inputs contain the original entries and pseudo-compounds: concatenations of two random entries of the
+input, word and transcript (e.g. 'hestur' + 'vagn' -> 'hesturvagn'). They keep the format and the symbol
+inventory of the step input, such that every processor accepts them.
+
+The results are written as JSON, pass the result file of an earlier commit to --compare to see the changes:
+
+    PYTHONPATH=. python3 benchmarks/run_benchmarks.py --scales 1,10 --out bench_new.json --compare bench_old.json
+
+Entry points needing the compound database (dict_database/dictionary.db) are skipped if it does not exist,
+syllabify_tree_dict() is then run on trees without compound division.
+
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import datetime
+import tempfile
+import subprocess
+import tracemalloc
+
+import processors.ipa_corrector as corr
+import processors.diphthong_consistency as diph
+import processors.post_aspiration as postaspir
+import processors.grapheme_phoneme_mapping as g2p
+import processors.ipa2x_sampa as ipa2sampa
+from processors.align_phonemes import Aligner
+from processors.multiple_transcripts import MultipleTranscripts
+from pron_dict import entry
+from pron_dict.syllabification import syllabify_tree_dict
+
+RAW_IPD = 'data/01_phoneset_consistency/original_IPD_WordList_IPA_SAMPA.csv'
+SYMBOL_MAP = 'data/00_phonesets/ipa_xsampa.txt'
+DATABASE = 'dict_database/dictionary.db'
+
+DEFAULT_SCALES = '1,10,100'
+SEED = 42
+
+
+def read_lines(filename):
+    with open(filename) as f:
+        return [line.rstrip('\n') for line in f if line.strip()]
+
+
+def read_raw_ipa(filename):
+    """
+    The IPA column of the original IPD, as cut by main.cut_columns(): 'word\tipa', ':' replaced by 'ː'
+    """
+    lines = []
+    for line in read_lines(filename):
+        cols = line.split(',')
+        lines.append(cols[0] + '\t' + cols[1].replace(':', 'ː'))
+    return lines
+
+
+def to_xsampa(lines):
+    converter = ipa2sampa.load_converter(SYMBOL_MAP)
+    converted, errors = converter.convert_lines(lines)
+    return converted
+
+
+def scale_lines(lines, scale, seed=SEED):
+    """
+    :param lines: dictionary lines 'word\ttranscript'
+    :param scale: the size of the result relative to lines
+    :return: lines and (scale - 1) * len(lines) pseudo-compounds, sorted by word
+    """
+    if scale <= 1:
+        return list(lines)
+
+    rand = random.Random(seed)
+    entries = [line.split('\t')[:2] for line in lines]
+    # transcripts in the early steps are not yet aligned (no spaces between the phones)
+    sep = ' ' if any(' ' in transcr for word, transcr in entries[:100]) else ''
+    words = set(word for word, transcr in entries)
+    synthetic = []
+    target = (scale - 1) * len(lines)
+    while len(synthetic) < target:
+        mod_word, mod_transcr = rand.choice(entries)
+        head_word, head_transcr = rand.choice(entries)
+        word = mod_word + head_word
+        if word in words:
+            continue
+        words.add(word)
+        synthetic.append(word + '\t' + mod_transcr + sep + head_transcr)
+
+    scaled = list(lines) + synthetic
+    scaled.sort(key=lambda line: line.split('\t')[0])
+    return scaled
+
+
+def write_input(lines, directory, filename):
+    path = os.path.join(directory, filename)
+    with open(path, 'w') as f:
+        for line in lines:
+            f.write(line + '\n')
+    return path
+
+
+################################################################################
+#
+#   Entry points: each setup function gets the input lines and a temporary
+#   directory, and returns a function running the entry point once and
+#   returning the number of output entries
+#
+################################################################################
+
+def setup_ipa_corrector(lines, tmp_dir):
+    path = write_input(lines, tmp_dir, 'original_IPD_IPA.csv')
+
+    def run():
+        # the corrector collects its results in module level lists
+        for results in (corr.corrected_context_dep, corr.corrected, corr.unknown, corr.dict_out):
+            del results[:]
+        corr.correct_inconsistencies(path)
+        return len(corr.dict_out)
+    return run
+
+
+def setup_aligner(lines, tmp_dir):
+    transcripts = [line.split('\t')[1] for line in lines]
+
+    def run():
+        aligner = Aligner(cleanup='ˈ')
+        aligned = 0
+        for transcr in transcripts:
+            try:
+                aligner.align(transcr)
+                aligned += 1
+            except ValueError:
+                pass
+        return aligned
+    return run
+
+
+def setup_diphthongs(lines, tmp_dir):
+    path = write_input(lines, tmp_dir, 'IPD_IPA_consistent_aligned.csv')
+
+    def run():
+        return len(diph.filter_consistent_transcripts(path))
+    return run
+
+
+def setup_multiple_transcripts(lines, tmp_dir):
+    path = write_input(lines, tmp_dir, 'IPD_IPA_diphthong_consistent.csv')
+
+    def run():
+        multi_transcr = MultipleTranscripts()
+        multi_transcr.process_dictionary(path)
+        return len(multi_transcr.filtered_dictionary)
+    return run
+
+
+def setup_postaspiration(lines, tmp_dir):
+    dict_lines = [line + '\n' for line in lines]
+
+    def run():
+        return len(postaspir.ensure_postaspir(dict_lines))
+    return run
+
+
+def setup_compound_analysis(lines, tmp_dir):
+    import processors.compound_analysis as comp
+    dict_lines = [line + '\n' for line in lines]
+
+    def run():
+        comp.SPAN_MEMO.clear()
+        return len(comp.collect_entries(comp.process_dictionary(dict_lines)))
+    return run
+
+
+def setup_g2p_mapping(lines, tmp_dir):
+    path = write_input(to_xsampa(lines), tmp_dir, 'IPD_XSAMPA_compound_filtered_final.csv')
+
+    def run():
+        g2p_mappings, low_freq = g2p.process_dictionary(path)
+        return len(g2p_mappings)
+    return run
+
+
+class _Leaf:
+    """
+    A compound tree without compound division, used if the compound database is not available
+    """
+    def __init__(self, dict_entry):
+        self.elem = dict_entry
+        self.left = None
+        self.right = None
+
+
+def setup_syllabification(lines, tmp_dir):
+    entries = [line.split('\t')[:2] for line in to_xsampa(lines)]
+    if has_database():
+        from pron_dict.tree_builder import build_compound_tree
+    else:
+        build_compound_tree = _Leaf
+
+    def run():
+        trees = [build_compound_tree(entry.PronDictEntry(word, transcr)) for word, transcr in entries]
+        # no leaf cache, to measure the same work for each run
+        return len(syllabify_tree_dict(trees, cache=None))
+    return run
+
+
+# entry point, step input, function reading the input lines, setup function, requires the compound database
+BENCHMARKS = [
+    ('ipa_corrector.correct_inconsistencies', RAW_IPD, read_raw_ipa, setup_ipa_corrector, False),
+    ('Aligner.align', RAW_IPD, read_raw_ipa, setup_aligner, False),
+    ('diphthong_consistency.filter_consistent_transcripts', 'data/01_phoneset_consistency/IPD_IPA_consistent_aligned.csv',
+     read_lines, setup_diphthongs, False),
+    ('MultipleTranscripts.process_dictionary', 'data/02_diphthongs/IPD_IPA_diphthong_consistent.csv',
+     read_lines, setup_multiple_transcripts, False),
+    ('post_aspiration.ensure_postaspir', 'data/03_multiple_transcripts/IPD_IPA_multiple_transcript_processed.csv',
+     read_lines, setup_postaspiration, False),
+    ('compound_analysis.process_dictionary', 'data/04_postaspiration/IPD_IPA_postaspir_corrected.csv',
+     read_lines, setup_compound_analysis, True),
+    ('grapheme_phoneme_mapping.process_dictionary', 'data/06_compounds/IPD_IPA_compound_filtered_final.csv',
+     read_lines, setup_g2p_mapping, False),
+    ('syllabify_tree_dict', 'data/08_final_version/IPD_IPA_clean.csv', read_lines, setup_syllabification, False),
+]
+
+
+def has_database():
+    return os.path.exists(DATABASE)
+
+
+def measure(run, memory=True):
+    """
+    :return: a dict with wall time and CPU time in seconds, number of output entries and, if memory is True,
+    the peak of allocated memory in bytes from a second run
+    """
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    output_entries = run()
+    result = {'wall_s': round(time.perf_counter() - wall, 4),
+              'cpu_s': round(time.process_time() - cpu, 4),
+              'output_entries': output_entries}
+    if memory:
+        tracemalloc.start()
+        run()
+        result['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+
+def run_benchmarks(scales, selected=None, memory=True):
+    results = []
+    for name, inputfile, reader, setup, needs_db in BENCHMARKS:
+        if selected and not any(sel in name for sel in selected):
+            continue
+        if needs_db and not has_database():
+            print(name + ': skipped, ' + DATABASE + ' not found', file=sys.stderr)
+            continue
+        lines = reader(inputfile)
+        for scale in scales:
+            scaled = scale_lines(lines, scale)
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                run = setup(scaled, tmp_dir)
+                result = {'entry_point': name, 'input': inputfile, 'scale': scale, 'input_entries': len(scaled)}
+                result.update(measure(run, memory))
+            results.append(result)
+            print(format_result(result), file=sys.stderr)
+    return results
+
+
+def format_result(result):
+    line = '{:<52} {:>4}x {:>9} entries {:>9.3f}s wall {:>9.3f}s cpu'.format(
+        result['entry_point'], result['scale'], result['input_entries'], result['wall_s'], result['cpu_s'])
+    if 'peak_bytes' in result:
+        line += ' {:>9.1f} MB peak'.format(result['peak_bytes'] / 1e6)
+    return line
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, old_report):
+    """
+    Print the relative change of wall time and memory peak for each run also found in old_report
+    """
+    old_results = {(r['entry_point'], r['scale']): r for r in old_report['results']}
+    for result in results:
+        old = old_results.get((result['entry_point'], result['scale']))
+        if old is None:
+            continue
+        line = '{:<52} {:>4}x  wall {:+7.1%}'.format(result['entry_point'], result['scale'],
+                                                   result['wall_s'] / old['wall_s'] - 1 if old['wall_s'] else 0)
+        if 'peak_bytes' in result and old.get('peak_bytes'):
+            line += '  peak {:+7.1%}'.format(result['peak_bytes'] / old['peak_bytes'] - 1)
+        print(line)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmarks the processing steps of the IPD pipeline',
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--scales', default=DEFAULT_SCALES,
+                        help='Comma separated scale factors of the inputs, 1 is the original step input')
+    parser.add_argument('--only', nargs='*',
+                        help='Only run the entry points containing one of these strings')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='Only measure time, skip the tracemalloc run')
+    parser.add_argument('--out', default='benchmark_results.json', help='JSON result file')
+    parser.add_argument('--compare', type=argparse.FileType('r'),
+                        help='JSON result file of an earlier run to compare with')
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    scales = [int(scale) for scale in args.scales.split(',')]
+    results = run_benchmarks(scales, args.only, not args.no_memory)
+    report = {'commit': git_commit(),
+              'date': datetime.datetime.now().isoformat(timespec='seconds'),
+              'python': platform.python_version(),
+              'platform': platform.platform(),
+              'compound_database': has_database(),
+              'results': results}
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.compare:
+        compare(results, json.load(args.compare))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Generates synthetic pronunciation dictionaries of any size for scaling tests of the pipeline.
+
+The generator learns from data/08_final_version/IPD_IPA_clean.csv:
+
+    - a trigram model over graphones (grapheme, phones), from the grapheme-phoneme alignment of the
+      dictionary (see grapheme_phoneme_mapping.align_g2p()), used to sample new words with transcripts
+    - compound components: modifiers and heads from the compound database (dict_database/dictionary.db) if
+      it exists, otherwise entries of the dictionary itself
+
+A generated dictionary contains sampled words, compounds of components with their transcripts, variants
+(an additional transcript for a word, differing in vowel length or voicing) and entries with injected symbol
+errors (symbols corrected or rejected by ipa_corrector), the rates of each are set on the command line.
+The output is sorted by word, in IPA by default, like the stage inputs of the pipeline.
+
+Usage:
+
+    PYTHONPATH=. python3 benchmarks/synthetic_lexicon.py --size 1000000 --compound-rate 0.3 --variant-rate 0.05
+        --error-rate 0.01 --out IPD_IPA_synthetic_1M.csv
+
+"""
+
+import os
+import sys
+import random
+import argparse
+from bisect import bisect
+
+import processors.grapheme_phoneme_mapping as g2p
+import processors.ipa2x_sampa as ipa2sampa
+import processors.ipa_corrector as corr
+
+IPD_FILE = 'data/08_final_version/IPD_IPA_clean.csv'
+SYMBOL_MAP = 'data/00_phonesets/ipa_xsampa.txt'
+DATABASE = 'dict_database/dictionary.db'
+
+# word boundary graphone
+BOUNDARY = ('', '')
+MAX_GRAPHONES = 30
+
+# X-SAMPA phones with a voiceless counterpart, used for variants
+VOICING = {'l': 'l_0', 'm': 'm_0', 'n': 'n_0', 'r': 'r_0', 'J': 'J_0', 'N': 'N_0'}
+VOICING.update({voiceless: voiced for voiced, voiceless in list(VOICING.items())})
+
+# symbols replaced by ipa_corrector, or making it reject an entry
+ERROR_SYMBOLS = sorted(corr.non_valid_symbols) + corr.unknown_errors
+
+
+class GraphoneModel:
+    """
+    Trigram model over graphones. Each aligned word is padded with two BOUNDARY graphones at the beginning and
+    one at the end. Sampling always continues from a context seen in training, so no backoff is needed.
+    """
+
+    def __init__(self):
+        self.counts = {}        # (graphone, graphone) -> {graphone: count}
+        self.distributions = {}
+
+    def train(self, aligned_words):
+        """
+        :param aligned_words: an iterable of lists of (grapheme, phones) tuples
+        """
+        for graphones in aligned_words:
+            context = (BOUNDARY, BOUNDARY)
+            for graphone in graphones + [BOUNDARY]:
+                following = self.counts.setdefault(context, {})
+                following[graphone] = following.get(graphone, 0) + 1
+                context = (context[1], graphone)
+        self.distributions = {}
+
+    def _distribution(self, context):
+        dist = self.distributions.get(context)
+        if dist is None:
+            graphones = list(self.counts[context].keys())
+            cumulative = []
+            total = 0
+            for graphone in graphones:
+                total += self.counts[context][graphone]
+                cumulative.append(total)
+            dist = (graphones, cumulative, total)
+            self.distributions[context] = dist
+        return dist
+
+    def sample(self, rand):
+        """
+        :return: a list of (grapheme, phones) tuples, at most MAX_GRAPHONES long
+        """
+        context = (BOUNDARY, BOUNDARY)
+        graphones = []
+        while len(graphones) < MAX_GRAPHONES:
+            candidates, cumulative, total = self._distribution(context)
+            graphone = candidates[bisect(cumulative, rand.random() * total)]
+            if graphone == BOUNDARY:
+                break
+            graphones.append(graphone)
+            context = (context[1], graphone)
+        return graphones
+
+
+def align_dictionary(xsampa_lines):
+    """
+    :return: a list of graphone lists, for all entries whose alignment covers the whole word and transcript
+    """
+    aligner = g2p.G2P_align(xsampa_lines, 1000)
+    aligner.extend_mapping(xsampa_lines)
+    aligned_words = []
+    for line in xsampa_lines:
+        word, transcr = line.strip().split('\t')
+        aligned = [(grapheme, phones.strip()) for grapheme, phones in g2p.align_g2p(word, transcr, aligner.g2p_map)]
+        if ''.join([grapheme for grapheme, phones in aligned]) != word:
+            continue
+        if ' '.join([phones for grapheme, phones in aligned if phones]) != ' '.join(transcr.split()):
+            continue
+        aligned_words.append(aligned)
+    return aligned_words
+
+
+def load_components(transcripts):
+    """
+    :param transcripts: dict word -> X-SAMPA transcript
+    :return: lists of (word, transcript) for modifiers and heads, from the compound database if available
+    """
+    if os.path.exists(DATABASE):
+        from dict_database import comp_dict_db
+        modifiers = [(w, transcripts[w]) for w in comp_dict_db.get_modifier_map() if w in transcripts]
+        heads = [(w, transcripts[w]) for w in comp_dict_db.get_head_map() if w in transcripts]
+        if modifiers and heads:
+            return modifiers, heads
+    entries = sorted(transcripts.items())
+    return entries, entries
+
+
+class SyntheticLexicon:
+
+    def __init__(self, ipd_file=IPD_FILE, symbol_map=SYMBOL_MAP):
+        with open(ipd_file) as f:
+            ipa_lines = [line for line in f if line.strip()]
+        with open(symbol_map) as f:
+            ipa_to_xsampa = ipa2sampa.create_transcription_map(f)
+        self.xsampa_to_ipa = {xsampa: ipa for ipa, xsampa in ipa_to_xsampa.items()}
+
+        xsampa_lines, unmapped = ipa2sampa.TranscriptionConverter(ipa_to_xsampa).convert_lines(ipa_lines)
+        self.model = GraphoneModel()
+        self.model.train(align_dictionary(xsampa_lines))
+
+        transcripts = {}
+        for line in xsampa_lines:
+            word, transcr = line.split('\t')
+            transcripts.setdefault(word, transcr)
+        self.words = set(transcripts)
+        self.modifiers, self.heads = load_components(transcripts)
+
+    def sample_word(self, rand):
+        graphones = self.model.sample(rand)
+        word = ''.join([grapheme for grapheme, phones in graphones])
+        transcr = ' '.join([phones for grapheme, phones in graphones if phones])
+        return word, transcr
+
+    def sample_compound(self, rand):
+        mod_word, mod_transcr = rand.choice(self.modifiers)
+        head_word, head_transcr = rand.choice(self.heads)
+        return mod_word + head_word, mod_transcr + ' ' + head_transcr
+
+    @staticmethod
+    def variant(transcr, rand):
+        """
+        :return: transcr with one vowel length or one voicing changed, None if no phone can be changed
+        """
+        phones = transcr.split()
+        candidates = [ind for ind, p in enumerate(phones)
+                      if p in VOICING or p.rstrip(':') in g2p.SHORT_VOWELS]
+        if not candidates:
+            return None
+        ind = rand.choice(candidates)
+        p = phones[ind]
+        if p in VOICING:
+            phones[ind] = VOICING[p]
+        elif p.endswith(':'):
+            phones[ind] = p[:-1]
+        else:
+            phones[ind] = p + ':'
+        return ' '.join(phones)
+
+    def to_ipa(self, transcr):
+        return ' '.join([self.xsampa_to_ipa.get(p, p) for p in transcr.split()])
+
+    @staticmethod
+    def inject_error(transcr, rand):
+        phones = transcr.split()
+        phones[rand.randrange(len(phones))] = rand.choice(ERROR_SYMBOLS)
+        return ' '.join(phones)
+
+    def generate(self, size, compound_rate=0.3, variant_rate=0.05, error_rate=0.01, seed=1, ipa=True,
+                 include_original=False):
+        """
+        :param size: the number of entries to generate
+        :param compound_rate: part of the words built as compounds of dictionary components
+        :param variant_rate: part of the words getting a second transcript
+        :param error_rate: part of the entries with an injected symbol error
+        :param ipa: if False, the transcripts are X-SAMPA
+        :param include_original: if True, generated words can also be words of the original dictionary
+        :return: a list of 'word\ttranscript' lines, sorted by word
+        """
+        rand = random.Random(seed)
+        used = set() if include_original else set(self.words)
+        entries = []
+        while len(entries) < size:
+            if rand.random() < compound_rate:
+                word, transcr = self.sample_compound(rand)
+            else:
+                word, transcr = self.sample_word(rand)
+            if not word or not transcr or word in used:
+                continue
+            used.add(word)
+            transcripts = [transcr]
+            if rand.random() < variant_rate:
+                variant = self.variant(transcr, rand)
+                if variant:
+                    transcripts.append(variant)
+            for transcr in transcripts[:size - len(entries)]:
+                if ipa:
+                    transcr = self.to_ipa(transcr)
+                if rand.random() < error_rate:
+                    transcr = self.inject_error(transcr, rand)
+                entries.append((word, transcr))
+
+        entries.sort(key=lambda x: x[0])
+        return [word + '\t' + transcr for word, transcr in entries]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Generates a synthetic pronunciation dictionary',
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--size', type=int, default=100000, help='Number of entries to generate')
+    parser.add_argument('--compound-rate', type=float, default=0.3)
+    parser.add_argument('--variant-rate', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.01)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--xsampa', action='store_true', help='Write X-SAMPA instead of IPA transcripts')
+    parser.add_argument('--unaligned', action='store_true',
+                        help='Remove the spaces between phones, like in the original IPD')
+    parser.add_argument('--ipd', default=IPD_FILE, help='Dictionary to learn from')
+    parser.add_argument('--out', type=argparse.FileType('w'), default=sys.stdout)
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    generator = SyntheticLexicon(args.ipd)
+    lines = generator.generate(args.size, args.compound_rate, args.variant_rate, args.error_rate, args.seed,
+                               ipa=not args.xsampa)
+    for line in lines:
+        if args.unaligned:
+            word, transcr = line.split('\t')
+            line = word + '\t' + transcr.replace(' ', '')
+        args.out.write(line + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Persistent cache of g2p transcripts of out-of-vocabulary words.
+
+The transcripts are stored in an SQLite database, keyed by the SHA-1 hash of the g2p model file and the normalised
+word (lowercase, NFKD). A retrained model thus never gets transcripts of an earlier model, and one cache file
+can hold the transcripts of several models.
+
+The cache holds at most max_entries transcripts. If an insert exceeds the limit, the least recently used entries
+are deleted, down to EVICT_TO of the limit. Usage of an entry is recorded with a counter, stored with the entry.
+
+Usage:
+
+    cache = G2PCache('g2p_cache.db', 'g2p_model')
+    transcr = cache.get('Reykjavík')
+    if transcr is None:
+        transcr = ...
+        cache.put('Reykjavík', transcr)
+    print(cache.stats())
+    cache.close()
+
+"""
+
+import hashlib
+import sqlite3
+import argparse
+import unicodedata
+
+DEFAULT_MAX_ENTRIES = 1000000
+# after eviction, the cache is filled to this part of max_entries
+EVICT_TO = 0.9
+# number of changes before a commit
+COMMIT_INTERVAL = 1000
+
+SQL_CREATE = 'CREATE TABLE IF NOT EXISTS g2p_cache(model TEXT, word TEXT, transcript TEXT, last_used INTEGER, ' \
+             'PRIMARY KEY(model, word))'
+SQL_CREATE_INDEX = 'CREATE INDEX IF NOT EXISTS g2p_cache_last_used ON g2p_cache(last_used)'
+SQL_SELECT = 'SELECT transcript FROM g2p_cache WHERE model = ? AND word = ?'
+SQL_TOUCH = 'UPDATE g2p_cache SET last_used = ? WHERE model = ? AND word = ?'
+SQL_INSERT = 'INSERT OR REPLACE INTO g2p_cache(model, word, transcript, last_used) VALUES(?, ?, ?, ?)'
+SQL_COUNT = 'SELECT COUNT(*) FROM g2p_cache'
+SQL_COUNT_MODEL = 'SELECT COUNT(*) FROM g2p_cache WHERE model = ?'
+SQL_MAX_USED = 'SELECT MAX(last_used) FROM g2p_cache'
+SQL_EVICT = 'DELETE FROM g2p_cache WHERE last_used <= (SELECT last_used FROM g2p_cache ORDER BY last_used ' \
+            'LIMIT 1 OFFSET ?)'
+SQL_DELETE_MODEL = 'DELETE FROM g2p_cache WHERE model = ?'
+
+
+def file_hash(filename):
+    sha1 = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+
+def normalise(word):
+    return unicodedata.normalize('NFKD', word.lower())
+
+
+class G2PCache:
+
+    def __init__(self, db_file, model_file=None, model_hash=None, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+        :param db_file: the SQLite database file, created if it does not exist
+        :param model_file: the g2p model, its hash is computed on first use of the cache
+        :param model_hash: the hash of the model, if model_file is not given
+        :param max_entries: maximum number of transcripts in the cache, for all models
+        """
+        if model_file is None and model_hash is None:
+            raise ValueError('G2PCache needs a model file or a model hash')
+        self.model_file = model_file
+        self._model_hash = model_hash
+        self.max_entries = max_entries
+        self.conn = sqlite3.connect(db_file)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(SQL_CREATE)
+        self.conn.execute(SQL_CREATE_INDEX)
+        self.conn.commit()
+        self.size = self.conn.execute(SQL_COUNT).fetchone()[0]
+        self.clock = self.conn.execute(SQL_MAX_USED).fetchone()[0] or 0
+        self.changes = 0
+        self.hits = 0
+        self.misses = 0
+        self.inserts = 0
+        self.evictions = 0
+
+    @property
+    def model_hash(self):
+        if self._model_hash is None:
+            self._model_hash = file_hash(self.model_file)
+        return self._model_hash
+
+    def _tick(self):
+        self.clock += 1
+        self.changes += 1
+        if self.changes >= COMMIT_INTERVAL:
+            self.commit()
+        return self.clock
+
+    def get(self, word):
+        """
+        :return: the cached transcript of word, None if word is not in the cache
+        """
+        key = normalise(word)
+        row = self.conn.execute(SQL_SELECT, (self.model_hash, key)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.conn.execute(SQL_TOUCH, (self._tick(), self.model_hash, key))
+        return row[0]
+
+    def get_many(self, words):
+        """
+        :return: a dict word -> transcript for all words found in the cache
+        """
+        result = {}
+        for word in words:
+            if word not in result:
+                transcr = self.get(word)
+                if transcr is not None:
+                    result[word] = transcr
+        return result
+
+    def put(self, word, transcript):
+        self.put_many([(word, transcript)])
+
+    def put_many(self, pairs):
+        """
+        :param pairs: an iterable of (word, transcript)
+        """
+        for word, transcript in pairs:
+            key = normalise(word)
+            exists = self.conn.execute(SQL_SELECT, (self.model_hash, key)).fetchone() is not None
+            self.conn.execute(SQL_INSERT, (self.model_hash, key, transcript, self._tick()))
+            if not exists:
+                self.size += 1
+                self.inserts += 1
+        if self.size > self.max_entries:
+            self.evict(int(self.max_entries * EVICT_TO))
+
+    def evict(self, keep):
+        """
+        Delete the least recently used entries, such that at most keep entries are left
+        """
+        if self.size <= keep:
+            return
+        self.conn.execute(SQL_EVICT, (self.size - keep - 1,))
+        size = self.conn.execute(SQL_COUNT).fetchone()[0]
+        self.evictions += self.size - size
+        self.size = size
+        self.commit()
+
+    def clear_model(self):
+        """
+        Delete all transcripts of the model of this cache
+        """
+        self.conn.execute(SQL_DELETE_MODEL, (self.model_hash,))
+        self.size = self.conn.execute(SQL_COUNT).fetchone()[0]
+        self.commit()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'entries': self.size,
+                'model_entries': self.conn.execute(SQL_COUNT_MODEL, (self.model_hash,)).fetchone()[0],
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'inserts': self.inserts,
+                'evictions': self.evictions}
+
+    def commit(self):
+        self.conn.commit()
+        self.changes = 0
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Shows statistics of a g2p cache or clears it for a model')
+    parser.add_argument('cache', help='The cache database file')
+    parser.add_argument('model', help='The g2p model file')
+    parser.add_argument('--clear', action='store_true', help='Delete all transcripts of the model')
+    args = parser.parse_args()
+
+    cache = G2PCache(args.cache, args.model)
+    if args.clear:
+        cache.clear_model()
+    for key, value in cache.stats().items():
+        print(key + '\t' + str(value))
+    cache.close()
+
+
+if __name__ == '__main__':
+    main()
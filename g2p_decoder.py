@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+In-process g2p decoding with Sequitur joint-sequence models.
+
+Reads a model written by Sequitur's g2p.py (--write-model) and finds the most probable graphone sequence for a word,
+without running g2p.py as an external script (see G2P_Experiment.get_oov_pronunciation()). Sequitur does not
+need to be installed: the model pickle is read by SequiturUnpickler, which replaces all Sequitur classes by plain
+placeholder objects holding the pickled state. From the state the decoder takes:
+
+    leftInventory.list, rightInventory.list     the letters and phones, index 0 is __void__, 1 is __term__
+    inventory                                   the graphones, a list of (letter indices, phone indices),
+                                                graphone index i + 1 is the list element i, graphone 1 is (term, term)
+    sequenceModel                               the n-grams, a list of (history, predicted graphone, -log prob).
+                                                Histories are ordered oldest first, predicted None denotes the
+                                                back-off weight of the history
+
+The decoder is a Viterbi search over (letter position, n-gram history), each graphone consuming the letters it
+covers. The history is always shortened to the longest history known to the model, such that paths with the same
+prediction context are merged. A word starts and ends with the term graphone, like in Sequitur.
+
+Usage:
+
+    decoder = load_decoder('g2p_model')
+    decoder.transcribe('hestur')                    # 'h E s t Y r'
+    decoder.transcribe_batch(['hestur', 'vagn'])
+
+    python3 g2p_decoder.py --model g2p_model --apply words.txt
+
+"""
+
+import sys
+import pickle
+import argparse
+
+TERM = 1
+# -log of the lowest probability of a path relative to the best path at the same letter position
+BEAM = 12.0
+
+
+class SequiturObject:
+    """
+    Placeholder for all objects of a Sequitur model pickle, keeps the attributes or the state of the object
+    """
+
+    def __init__(self, *args):
+        self.args = args
+
+    def __setstate__(self, state):
+        if isinstance(state, dict):
+            self.__dict__.update(state)
+        else:
+            self.state = state
+
+
+class SequiturUnpickler(pickle.Unpickler):
+    """
+    Unpickles Sequitur models without importing Sequitur or numpy, every class is replaced by a subclass of
+    SequiturObject. No other code than the unpickling of plain python objects is run.
+    """
+
+    SAFE_BUILTINS = {('copyreg', '_reconstructor'), ('copy_reg', '_reconstructor'),
+                     ('builtins', 'object'), ('__builtin__', 'object'),
+                     ('builtins', 'set'), ('__builtin__', 'set'), ('builtins', 'frozenset')}
+
+    def __init__(self, file, **kwargs):
+        super().__init__(file, **kwargs)
+        self.classes = {}
+
+    def find_class(self, module, name):
+        if (module, name) in self.SAFE_BUILTINS:
+            return super().find_class(module, name)
+        if (module, name) not in self.classes:
+            self.classes[(module, name)] = type(name, (SequiturObject,), {'__module__': module})
+        return self.classes[(module, name)]
+
+
+def is_py2_pickle(filename):
+    """
+    :return: True if filename was pickled by Python 2, i.e. with a pickle protocol < 3
+    """
+    with open(filename, 'rb') as f:
+        header = f.read(2)
+    return len(header) < 2 or header[0] != 0x80 or header[1] < 3
+
+
+def read_sequitur_model(filename):
+    """
+    :return: the unpickled model, a SequiturObject with the attributes 'sequitur' and 'sequenceModel'
+    """
+    with open(filename, 'rb') as f:
+        if is_py2_pickle(filename):
+            # models written by Python 2 versions of Sequitur
+            return SequiturUnpickler(f, encoding='latin1').load()
+        return SequiturUnpickler(f).load()
+
+
+def _py2_symbol(symbol):
+    # utf-8 encoded Python 2 strings are decoded as latin1 by the unpickler
+    if isinstance(symbol, bytes):
+        return symbol.decode('utf-8')
+    try:
+        return symbol.encode('latin1').decode('utf-8')
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return symbol
+
+
+def _state(obj):
+    return obj.state if hasattr(obj, 'state') else obj
+
+
+class GraphoneDecoder:
+
+    def __init__(self, letters, phones, graphones, ngrams, init=TERM, term=TERM, beam=BEAM):
+        """
+        :param letters: list of letter symbols, indexed by the letter indices of graphones
+        :param phones: list of phone symbols, indexed by the phone indices of graphones
+        :param graphones: list of (letter indices, phone indices), graphone i + 1 is element i
+        :param ngrams: list of (history, predicted, score) tuples, score is -log probability
+        :param init: the graphone starting each word
+        :param term: the graphone ending each word
+        :param beam: paths scoring more than beam worse than the best path at the same letter position are not
+        expanded, None for an exhaustive search
+        """
+        self.init = init
+        self.term = term
+        self.beam = beam
+        self.letter_index = {symbol: ind for ind, symbol in enumerate(letters) if ind > TERM}
+        self.graphones = {}         # letter indices -> list of (graphone, phone symbols)
+        self.max_letters = 0
+        self.insertions = False     # are there graphones without letters?
+        for ind, (left, right) in enumerate(graphones):
+            token = ind + 1
+            if token == term:
+                continue
+            self.graphones.setdefault(tuple(left), []).append((token, tuple(phones[p] for p in right)))
+            self.max_letters = max(self.max_letters, len(left))
+            if not left:
+                self.insertions = True
+
+        self.probs = {}             # history -> {predicted: score}
+        self.backoffs = {}          # history -> back-off score
+        for history, predicted, score in ngrams:
+            history = tuple(history)
+            if predicted is None:
+                self.backoffs[history] = score
+            else:
+                self.probs.setdefault(history, {})[predicted] = score
+        self.histories = set(self.probs) | set(self.backoffs)
+        self.history_len = max([len(h) for h in self.histories] + [0])
+        self.scores = {}
+        self.transition_cache = {}
+
+    @classmethod
+    def from_sequitur_model(cls, model, py2=False, beam=BEAM):
+        sequitur = model.sequitur
+        letters = list(sequitur.leftInventory.list)
+        phones = list(sequitur.rightInventory.list)
+        if py2:
+            letters = [_py2_symbol(s) for s in letters]
+            phones = [_py2_symbol(s) for s in phones]
+        graphones = _state(sequitur.inventory)
+        init, term, ngrams, attributes = _state(model.sequenceModel)
+        return cls(letters, phones, graphones, ngrams, init, term, beam)
+
+    def score(self, history, token):
+        """
+        :return: -log p(token | history), with back-off to shorter histories
+        """
+        key = (history, token)
+        result = self.scores.get(key)
+        if result is not None:
+            return result
+        result = 0.0
+        while True:
+            dist = self.probs.get(history)
+            if dist is not None and token in dist:
+                result += dist[token]
+                break
+            result += self.backoffs.get(history, 0.0)
+            if not history:
+                break
+            history = history[1:]
+        self.scores[key] = result
+        return result
+
+    def transitions(self, history, letters):
+        """
+        :return: a list of (score, next history, phones) for all graphones of letters following history
+        """
+        key = (history, letters)
+        result = self.transition_cache.get(key)
+        if result is None:
+            result = [(self.score(history, token), self.next_history(history, token), phones)
+                      for token, phones in self.graphones.get(letters, ())]
+            self.transition_cache[key] = result
+        return result
+
+    def next_history(self, history, token):
+        history = (history + (token,))[-self.history_len:] if self.history_len else ()
+        while history and history not in self.histories:
+            history = history[1:]
+        return history
+
+    def parse(self, word):
+        """
+        :return: the tuple of letter indices of word, None if word contains a letter unknown to the model
+        """
+        try:
+            return tuple(self.letter_index[letter] for letter in word)
+        except KeyError:
+            return None
+
+    def decode(self, word):
+        """
+        :return: (score, list of phone tuples of the best graphone sequence), None if there is no graphone sequence
+        for word
+        """
+        letters = self.parse(word)
+        if not letters:
+            return None
+        n = len(letters)
+        # columns[pos]: history -> (score, previous position, previous history, phones of the last graphone)
+        columns = [{} for i in range(n + 1)]
+        columns[0][self.next_history((), self.init)] = (0.0, None, None, None)
+        min_length = 0 if self.insertions else 1
+        for pos in range(n + 1):
+            column = columns[pos]
+            if not column:
+                continue
+            threshold = min(state[0] for state in column.values()) + self.beam if self.beam else None
+            pending = list(column)
+            while pending:
+                history = pending.pop()
+                cost = column[history][0]
+                if threshold is not None and cost > threshold:
+                    continue
+                for length in range(min_length, min(self.max_letters, n - pos) + 1):
+                    target = columns[pos + length]
+                    for score, new_history, phones in self.transitions(history, letters[pos:pos + length]):
+                        new_cost = cost + score
+                        state = target.get(new_history)
+                        if state is None or new_cost < state[0]:
+                            target[new_history] = (new_cost, pos, history, phones)
+                            if length == 0:
+                                pending.append(new_history)
+
+        best = None
+        for history, (cost, prev_pos, prev_history, phones) in columns[n].items():
+            cost += self.score(history, self.term)
+            if best is None or cost < best[0]:
+                best = (cost, history)
+        if best is None:
+            return None
+
+        cost, history = best
+        result = []
+        pos = n
+        while True:
+            step_cost, prev_pos, prev_history, phones = columns[pos][history]
+            if prev_pos is None:
+                break
+            result.append(phones)
+            pos, history = prev_pos, prev_history
+        result.reverse()
+        return cost, result
+
+    def transcribe(self, word):
+        """
+        :return: the transcript of word, phones separated by spaces, None if word can not be transcribed
+        """
+        decoded = self.decode(word)
+        if decoded is None:
+            return None
+        return ' '.join([p for phones in decoded[1] for p in phones])
+
+    def transcribe_batch(self, words):
+        """
+        :param words: an iterable of words, each distinct word is decoded once
+        :return: a list of transcripts in the order of words, None for words that can not be transcribed
+        """
+        transcripts = {}
+        result = []
+        for word in words:
+            if word not in transcripts:
+                transcripts[word] = self.transcribe(word)
+            result.append(transcripts[word])
+        return result
+
+
+def load_decoder(filename):
+    """
+    :return: a GraphoneDecoder for the Sequitur model in filename
+    """
+    return GraphoneDecoder.from_sequitur_model(read_sequitur_model(filename), is_py2_pickle(filename))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Transcribes words with a Sequitur g2p model',
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--model', required=True, help='Sequitur model file')
+    parser.add_argument('--apply', type=argparse.FileType('r'), default=sys.stdin,
+                        help='File with one word per line')
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    decoder = load_decoder(args.model)
+    words = [line.strip() for line in args.apply if line.strip()]
+    for word, transcr in zip(words, decoder.transcribe_batch(words)):
+        if transcr is None:
+            print('failed to convert "' + word + '"', file=sys.stderr)
+        else:
+            print(word + '\t' + transcr)
+
+
+if __name__ == '__main__':
+    main()
@@ -19,6 +19,11 @@ If you don't have the Levenshtein module installed:
 
 The 'lts' abbreviation used in the code stands for 'letter-to-sound'
 
+With --native, the words are transcribed in-process by g2p_decoder.py instead of calling the Sequitur script for
+each word, Sequitur is then only needed for training.
+With --cache_file, the transcripts are stored in a persistent cache (see g2p_cache.py), words transcribed by the
+same model in an earlier run are not transcribed again.
+
 """
 
 import os
@@ -32,17 +37,28 @@ import re
 import Levenshtein
 
 from processors import multiple_transcripts
+import g2p_decoder
+from g2p_cache import G2PCache
 
 
 class G2P_Experiment:
 
-    def __init__(self, model_filename, train_file='', ntrain=0, configfile='g2p.conf'):
+    def __init__(self, model_filename, train_file='', ntrain=0, configfile='g2p.conf', native=False,
+                 cache_file=None):
 
         current_dir = os.getcwd() + '/'
         config = configparser.ConfigParser()
         config.read(current_dir + configfile)
-        self.g2p_path = config['pythonpath']['path_export']
-        self.lts_tool = config['g2p_tool']['g2p']
+        if native:
+            # the config is only needed for training
+            self.g2p_path = config.get('pythonpath', 'path_export', fallback='')
+            self.lts_tool = config.get('g2p_tool', 'g2p', fallback='')
+        else:
+            self.g2p_path = config['pythonpath']['path_export']
+            self.lts_tool = config['g2p_tool']['g2p']
+        self.native = native
+        self.decoder = None # loaded on first use if native
+        self.cache = G2PCache(cache_file, model_filename) if cache_file else None
         self.train_file = train_file
         self.lts_fname = model_filename
         self.lts_model = '' # derived from lts_fname while processing
@@ -141,6 +157,9 @@ class G2P_Experiment:
         print('Errors: ' + str(per_count))
         print('Erroneous words: ' + str(len(errors)))
         print('WER: ' + str((len(errors) / len(test_data)) * 100.0) + '%')
+        if self.cache is not None:
+            self.cache.commit()
+            print('Cache: ' + str(self.cache.stats()))
         with open(test_out + '_phone_errors.txt', 'w') as f:
             for diff in sorted(subst_tuples, key=lambda x: subst_tuples[x], reverse=True):
                 f.write(
@@ -152,6 +171,22 @@ class G2P_Experiment:
 
     def get_oov_pronunciation(self, word):
 
+        if self.cache is not None:
+            pronun = self.cache.get(word)
+            if pronun is not None:
+                return pronun
+
+        if self.native:
+            pronun = self.get_native_pronunciation(word)
+        else:
+            pronun = self.get_sequitur_pronunciation(word)
+
+        if self.cache is not None:
+            self.cache.put(word, pronun)
+        return pronun
+
+    def get_sequitur_pronunciation(self, word):
+
         escaped_word = "'" + word.lower() + "'"
 
         comm = '%s echo %s | %s  --model %s --encoding utf8 --apply -' % (self.g2p_path, \
@@ -181,6 +216,16 @@ class G2P_Experiment:
         return pronun
 
 
+    def get_native_pronunciation(self, word):
+
+        if self.decoder is None:
+            self.decoder = g2p_decoder.load_decoder(self.lts_fname)
+        pronun = self.decoder.transcribe(word.lower())
+        if pronun is None:
+            print('failed to convert ' + word)
+            return ''
+        return unicodedata.normalize('NFKD', pronun)
+
     @staticmethod
     def compute_PER(transcr, hyp):
         """
@@ -224,6 +269,10 @@ def get_args_parser():
                         help='Max phones per graphone.')
     parser.add_argument('--gram_len', default=3,
                         help='Number of graphones to take into account.')
+    parser.add_argument('--native', action='store_true',
+                        help='Transcribe in-process with g2p_decoder.py instead of calling the Sequitur script.')
+    parser.add_argument('--cache_file',
+                        help='Persistent cache of the transcripts of the model, created if it does not exist.')
 
     return parser
 
@@ -250,7 +299,7 @@ def main():
         experiment.train_sequitur_g2p()
 
     else:
-        experiment = G2P_Experiment(args.model)
+        experiment = G2P_Experiment(args.model, native=args.native, cache_file=args.cache_file)
         print('testing ...')
         experiment.test_g2p(args.test_file, args.test_out)
 
@@ -13,7 +13,10 @@ The repository contains all scripts, input and expected output data.
 
 After the first 6 processing steps, a manual step was performed, searching errors according to different transcripts
 of compound components. The script thus stops after step 6, and should be run from step 7 to include the error list.
-To run the script without this interuption, adjust main() accordingly.
+To run the script without this interuption, select the steps with --to or --only, e.g. --from 1 --to 10.
+
+The steps are declared in pipeline_steps() with their input and output files, independent steps (e.g. the IPA and
+SAMPA alignments in step 1, or steps 5 and 6) are run concurrently with --jobs > 1, see pipeline_scheduler.py.
 
 The 'frob' token sometimes found when referring to the IPD comes from the Icelandic name:
 FRamburðarOrðaBók (pronunciation dictionary)
@@ -31,7 +34,11 @@ import processors.compound_analysis as comp
 import processors.ipa2x_sampa as ipa2sampa
 import processors.grapheme_phoneme_mapping as g2p
 import processors.google_pron_comparison as comparison
+import processors.rule_counters as rule_counters
 from processors.multiple_transcripts import MultipleTranscripts
+from pron_dict import binary_lexicon
+from step_profiler import StepProfiler
+from pipeline_scheduler import PipelineNode, PipelineGraph
 
 
 ################################################################################
@@ -46,13 +53,17 @@ def write_list(list2write, filename):
         for entry in list2write:
             f.write(entry + '\n')
 
-def remove_list(list2remove, dict_list, out_file):
+def filter_list(list2remove, dict_list):
 
     all_lower = [x.lower() for x in list2remove]
     set2remove = set(all_lower)
     clean_list = [x.strip() for x in dict_list if x.strip().lower() not in set2remove]
 
-    write_list(clean_list, out_file)
+    return clean_list
+
+def remove_list(list2remove, dict_list, out_file):
+
+    write_list(filter_list(list2remove, dict_list), out_file)
 
 #################################################################################
 #
@@ -90,7 +101,9 @@ def extract_inconsistencies(input_file, error_file, output_file, ipa=True):
 
 def correct_inconsistencies(inputfile):
 
+    rule_counters.reset('ipa_corrector')
     corr.correct_inconsistencies(inputfile)
+    rule_counters.write_report('ipa_corrector', os.path.dirname(inputfile))
 
 
 def phoneset_consistency_check(inputfile):
@@ -121,8 +134,10 @@ def phoneset_consistency_check(inputfile):
 
 def diphthong_consistency_check(inputfile, outputfile):
 
+    rule_counters.reset('diphthong_consistency')
     consistent_entries = diph.filter_consistent_transcripts(inputfile)
     write_list(consistent_entries, outputfile)
+    rule_counters.write_report('diphthong_consistency', os.path.dirname(outputfile))
 
 
 #################################################################################
@@ -137,8 +152,11 @@ def diphthong_consistency_check(inputfile, outputfile):
 
 def multiple_transcripts(inputfile, out_data_dir):
 
+    rule_counters.reset('multiple_transcripts')
     processor = MultipleTranscripts()
     processor.process_dictionary(inputfile)
+    # hits of the choice rules on the input, the second run below only cleans up
+    rule_counters.write_report('multiple_transcripts', out_data_dir)
 
     # Filtered dictionary, the final output will be created at the end of this method
     out = open(out_data_dir + '/IPD_IPA_multiple_transcript_processed_TMP.csv', 'w')
@@ -195,8 +213,10 @@ def correct_postaspiration(inputfile, output_dir):
 
     postaspir.find_missing_postaspir(dict_list, output_dir)
     postaspir.find_beginning_postaspir(dict_list, output_dir)
+    rule_counters.reset('post_aspiration')
     corrected = postaspir.ensure_postaspir(dict_list)
     write_list(corrected, output_dir + '/IPD_IPA_postaspir_corrected.csv')
+    rule_counters.write_report('post_aspiration', output_dir)
 
 #################################################################################
 #
@@ -211,12 +231,14 @@ def correct_postaspiration(inputfile, output_dir):
 #################################################################################
 
 def vowel_length_analysis(inputfile, out_dir):
-    pron_dict = open(inputfile).readlines()
-    no_len_symbols = length_sym.remove_length_symbols_from_dict(pron_dict)
-    non_initial_len_symbols = length_sym.find_length_symbol_after_1st(pron_dict)
-
-    write_list(no_len_symbols, out_dir + '/IPD_IPA_no_len_symbols.csv')
-    write_list(non_initial_len_symbols, out_dir + '/IPD_IPA_vowel_lengths_internal.csv')
+    # one pass over the input file, both outputs are written line by line
+    with open(inputfile) as pron_dict, \
+            open(out_dir + '/IPD_IPA_no_len_symbols.csv', 'w') as no_len_out, \
+            open(out_dir + '/IPD_IPA_vowel_lengths_internal.csv', 'w') as internal_out:
+        for line, no_len_symbols, late_length_symbol in length_sym.analyse_length_symbols(pron_dict):
+            no_len_out.write(no_len_symbols + '\n')
+            if late_length_symbol:
+                internal_out.write(line + '\n')
 
 #################################################################################
 #
@@ -231,10 +253,10 @@ def vowel_length_analysis(inputfile, out_dir):
 #
 #################################################################################
 
-def compound_analysis(inputfile, output_dir):
+def compound_analysis(inputfile, output_dir, processes=1):
 
     frob_in = open(inputfile).readlines()
-    pron_dict = comp.process_dictionary(frob_in)
+    pron_dict = comp.process_dictionary(frob_in, processes)
     compounds = comp.collect_entries(pron_dict)
     #non_comps = comp.collect_entries(pron_dict, comp=False)
     multi_transcr = comp.collect_multi_transcripts(pron_dict)
@@ -284,6 +306,10 @@ def remove_error_list(error_list, dict_list, out_file):
 
     remove_list(error_list, dict_list, out_file)
 
+def remove_compound_errors(error_list, inputfile, out_file):
+
+    remove_error_list(error_list, open(inputfile).readlines(), out_file)
+
 #################################################################################
 #
 #    8. Forced alignment
@@ -297,32 +323,27 @@ def remove_error_list(error_list, dict_list, out_file):
 
 def align_g2p(inputfile, out_dir):
     # convert inputdict to XSAMPA - g2p alignment only works with XSAMPA
-    converted_dict = convert_transcripts(inputfile, out_dir, 'data/00_phonesets/ipa_xsampa.txt', ['IPA', 'XSAMPA'])
-    aligned_dict, low_freq_mappings = g2p.process_dictionary(converted_dict)
+    # the conversion is done in memory, the same converter converts the results back to IPA
+    ipa2xsampa = ipa2sampa.load_converter('data/00_phonesets/ipa_xsampa.txt')
+    xsampa2ipa = ipa2xsampa.inverse()
+
+    xsampa_dict, unmapped = ipa2xsampa.convert_lines(open(inputfile).readlines())
+    write_list([x.symbol + '\t' + x.word + '\t' + x.transcript for x in unmapped],
+               out_dir + '/IPD_IPA_unmapped_symbols.txt')
+
+    aligned_dict, low_freq_mappings = g2p.process_entries(xsampa_dict)
 
     write_list(aligned_dict, out_dir + '/g2p_mappings.csv')
     write_list(low_freq_mappings, out_dir + '/IPD_XSAMPA_assumed_errors.txt')
 
     error_list = ['\t'.join(x.split('\t')[:2]) for x in low_freq_mappings]
-    remove_list(error_list, open(converted_dict).readlines(), out_dir + '/IPD_XSAMPA_align_errors_removed.csv')
+    clean_xsampa = filter_list(error_list, xsampa_dict)
 
     # convert again to IPA
-    convert_transcripts(out_dir + '/IPD_XSAMPA_align_errors_removed.csv', out_dir,
-                                  'data/00_phonesets/xsampa_ipa.txt', ['XSAMPA', 'IPA'])
-
-
-def convert_transcripts(inputfile, out_dir, symbol_map_file, replacement):
-    ipa_file = open(inputfile)
-    symbol_map = open(symbol_map_file)
-    transcription_map = ipa2sampa.create_transcription_map(symbol_map)
-
-    transcribed_dict = ipa2sampa.transcribe_dictionary(ipa_file, transcription_map)
-
-    filename = os.path.basename(inputfile)
-    out_file = out_dir + '/' + filename.replace(replacement[0], replacement[1])
-    write_list(transcribed_dict, out_file)
-
-    return out_file
+    clean_ipa, unmapped = xsampa2ipa.convert_lines(clean_xsampa)
+    write_list([x.symbol + '\t' + x.word + '\t' + x.transcript for x in unmapped],
+               out_dir + '/IPD_XSAMPA_unmapped_symbols.txt')
+    write_list(clean_ipa, out_dir + '/IPD_IPA_align_errors_removed.csv')
 
 #################################################################################
 #
@@ -334,10 +355,29 @@ def convert_transcripts(inputfile, out_dir, symbol_map_file, replacement):
 #
 #################################################################################
 
-def compare_googlei18n_sugg(inputfile, sugg_file, out_dir):
+def compare_googlei18n_sugg(inputfile, sugg_files, out_dir):
+    # sugg_files: one or more third-party suggestion files, all compared in one pass over each file
+    comparer = comparison.SuggestionComparison.from_file(inputfile)
+    errors_in_dict = comparer.compare_all(sugg_files)
+    for line in comparer.statistics_report():
+        print(line)
 
-    errors_in_dict = comparison.compare_words_with_transcr(inputfile, sugg_file)
-    remove_list(errors_in_dict, open(inputfile).readlines(), out_dir + '/IPD_IPA_clean.csv')
+    remove_list(errors_in_dict, comparer.lines, out_dir + '/IPD_IPA_clean.csv')
+
+#################################################################################
+#
+#    10. Binary lexicon
+#
+#   Input: data/08_final_version/IPD_IPA_clean.csv (40,431 entries)
+#
+#   Final output: data/08_final_version/IPD_IPA_clean.lex
+#   The same content as the input, in a memory-mappable format for fast word lookup (see pron_dict/binary_lexicon.py)
+#
+#################################################################################
+
+def write_binary_lexicon(inputfile, outputfile):
+
+    binary_lexicon.write_dictionary_file(inputfile, outputfile)
 
 #################################################################################
 #
@@ -345,95 +385,146 @@ def compare_googlei18n_sugg(inputfile, sugg_file, out_dir):
 #    To train a g2p model see g2p_experiment.py
 #
 #################################################################################
+def pipeline_steps(error_list, processes=1):
+    """
+    :param error_list: the list of erroneous entries removed in step 7, read from --comp_errors
+    :param processes: number of processes for the compound analysis in step 6
+    :return: the list of PipelineNodes of the IPD processing
+    """
+    raw_dir = 'data/01_phoneset_consistency'
+    out_data_dirs = ['data/02_diphthongs', 'data/03_multiple_transcripts', 'data/04_postaspiration',
+                     'data/05_vowel_length', 'data/06_compounds', 'data/07_alignment', 'data/08_final_version']
+    raw_ipd = raw_dir + '/original_IPD_WordList_IPA_SAMPA.csv'
+
+    return [
+        # 1. phoneset consistency, see phoneset_consistency_check()
+        PipelineNode(1, 'cut columns', cut_columns, (raw_ipd, raw_dir),
+                     inputs=[raw_ipd],
+                     outputs=[raw_dir + '/original_IPD_IPA.csv', raw_dir + '/original_IPD_SAMPA.csv']),
+        PipelineNode(1, 'IPA alignment', extract_inconsistencies,
+                     (raw_dir + '/original_IPD_IPA.csv', raw_dir + '/IPD_IPA_errors.txt',
+                      raw_dir + '/IPD_IPA_valid.csv'),
+                     inputs=[raw_dir + '/original_IPD_IPA.csv'],
+                     outputs=[raw_dir + '/IPD_IPA_valid.csv', raw_dir + '/IPD_IPA_errors.txt']),
+        PipelineNode(1, 'SAMPA alignment', extract_inconsistencies,
+                     (raw_dir + '/original_IPD_SAMPA.csv', raw_dir + '/IPD_SAMPA_errors.txt',
+                      raw_dir + '/IPD_SAMPA_valid.csv', False),
+                     inputs=[raw_dir + '/original_IPD_SAMPA.csv'],
+                     outputs=[raw_dir + '/IPD_SAMPA_valid.csv', raw_dir + '/IPD_SAMPA_errors.txt']),
+        PipelineNode(1, 'IPA correction', correct_inconsistencies, (raw_dir + '/original_IPD_IPA.csv',),
+                     inputs=[raw_dir + '/original_IPD_IPA.csv'],
+                     outputs=[raw_dir + '/original_IPD_IPA_consistent.csv']),
+        PipelineNode(1, 'consistent IPA alignment', extract_inconsistencies,
+                     (raw_dir + '/original_IPD_IPA_consistent.csv', raw_dir + '/IPD_IPA_consistent_errors.txt',
+                      raw_dir + '/IPD_IPA_consistent_aligned.csv'),
+                     inputs=[raw_dir + '/original_IPD_IPA_consistent.csv'],
+                     outputs=[raw_dir + '/IPD_IPA_consistent_aligned.csv', raw_dir + '/IPD_IPA_consistent_errors.txt']),
+        # 2. - 10.
+        PipelineNode(2, 'diphthong consistency', diphthong_consistency_check,
+                     (raw_dir + '/IPD_IPA_consistent_aligned.csv',
+                      out_data_dirs[0] + '/IPD_IPA_diphthong_consistent.csv'),
+                     inputs=[raw_dir + '/IPD_IPA_consistent_aligned.csv'],
+                     outputs=[out_data_dirs[0] + '/IPD_IPA_diphthong_consistent.csv']),
+        PipelineNode(3, 'variants', multiple_transcripts,
+                     (out_data_dirs[0] + '/IPD_IPA_diphthong_consistent.csv', out_data_dirs[1]),
+                     inputs=[out_data_dirs[0] + '/IPD_IPA_diphthong_consistent.csv'],
+                     outputs=[out_data_dirs[1] + '/IPD_IPA_multiple_transcript_processed.csv']),
+        PipelineNode(4, 'postaspiration', correct_postaspiration,
+                     (out_data_dirs[1] + '/IPD_IPA_multiple_transcript_processed.csv', out_data_dirs[2]),
+                     inputs=[out_data_dirs[1] + '/IPD_IPA_multiple_transcript_processed.csv'],
+                     outputs=[out_data_dirs[2] + '/IPD_IPA_postaspir_corrected.csv']),
+        PipelineNode(5, 'vowel length', vowel_length_analysis,
+                     (out_data_dirs[2] + '/IPD_IPA_postaspir_corrected.csv', out_data_dirs[3]),
+                     inputs=[out_data_dirs[2] + '/IPD_IPA_postaspir_corrected.csv'],
+                     outputs=[out_data_dirs[3] + '/IPD_IPA_no_len_symbols.csv',
+                              out_data_dirs[3] + '/IPD_IPA_vowel_lengths_internal.csv']),
+        PipelineNode(6, 'compound analysis', compound_analysis,
+                     (out_data_dirs[2] + '/IPD_IPA_postaspir_corrected.csv', out_data_dirs[4], processes),
+                     inputs=[out_data_dirs[2] + '/IPD_IPA_postaspir_corrected.csv'],
+                     outputs=[out_data_dirs[4] + '/IPD_IPA_compound_filtered.csv',
+                              out_data_dirs[4] + '/IPD_IPA_compounds.csv',
+                              out_data_dirs[4] + '/IPD_IPA_multitranscr.csv']),
+        PipelineNode(7, 'remove errors', remove_compound_errors,
+                     (error_list, out_data_dirs[4] + '/IPD_IPA_compound_filtered.csv',
+                      out_data_dirs[4] + '/IPD_IPA_compound_filtered_final.csv'),
+                     inputs=[out_data_dirs[4] + '/IPD_IPA_compound_filtered.csv'],
+                     outputs=[out_data_dirs[4] + '/IPD_IPA_compound_filtered_final.csv']),
+        PipelineNode(8, 'g2p alignment', align_g2p,
+                     (out_data_dirs[4] + '/IPD_IPA_compound_filtered_final.csv', out_data_dirs[5]),
+                     inputs=[out_data_dirs[4] + '/IPD_IPA_compound_filtered_final.csv'],
+                     outputs=[out_data_dirs[5] + '/IPD_IPA_align_errors_removed.csv']),
+        PipelineNode(9, 'comparison googlei18n suggestions', compare_googlei18n_sugg,
+                     (out_data_dirs[5] + '/IPD_IPA_align_errors_removed.csv', ['data/third_party/suggestions.csv'],
+                      out_data_dirs[6]),
+                     inputs=[out_data_dirs[5] + '/IPD_IPA_align_errors_removed.csv',
+                             'data/third_party/suggestions.csv'],
+                     outputs=[out_data_dirs[6] + '/IPD_IPA_clean.csv']),
+        PipelineNode(10, 'binary lexicon', write_binary_lexicon,
+                     (out_data_dirs[6] + '/IPD_IPA_clean.csv', out_data_dirs[6] + '/IPD_IPA_clean.lex'),
+                     inputs=[out_data_dirs[6] + '/IPD_IPA_clean.csv'],
+                     outputs=[out_data_dirs[6] + '/IPD_IPA_clean.lex']),
+    ]
+
 def parse_args():
 
     parser = argparse.ArgumentParser(
         description='Processes the raw Icelandic pronunciation dictionary to create a cleaner version',
         formatter_class=argparse.ArgumentDefaultsHelpFormatter)
-    parser.add_argument('--step', type=int, default=1,
-                        help='The first step of the process to run, then runs all subsequent steps')
+    parser.add_argument('--from', '--step', dest='from_step', type=int, default=1,
+                        help='The first step of the process to run, then runs all subsequent steps up to --to')
+    parser.add_argument('--to', dest='to_step', type=int,
+                        help='The last step to run. Defaults to step 6 if starting before the manual step, '
+                             'to step 10 otherwise')
+    parser.add_argument('--only', type=int, nargs='+',
+                        help='Only run these steps, overrides --from and --to')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Number of processes for running independent steps concurrently')
     parser.add_argument('--comp_errors', type=argparse.FileType('r'), default=sys.stdin,
                         help='Error file, remove this content from dictionary')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='Number of processes for the compound analysis in step 6')
+    parser.add_argument('--profile', action='store_true',
+                        help='Record time, memory and number of entries of each step, print a summary at the end')
+    parser.add_argument('--profile-trace', default='step_profile.json',
+                        help='JSON file for the records of --profile')
+    parser.add_argument('--cprofile-dir',
+                        help='With --profile, write a cProfile dump of each step into this directory')
 
     return parser.parse_args()
 
 def main():
 
     args = parse_args()
-    step = args.step
-
-    out_data_dirs = ['data/02_diphthongs', 'data/03_multiple_transcripts', 'data/04_postaspiration',
-                     'data/05_vowel_length', 'data/06_compounds', 'data/07_alignment', 'data/08_final_version']
-
-    # solve this within each step
-    if step == 1 or step == 2:
-        create_dirs = out_data_dirs
-    elif step > 4 and step < 7:
-        create_dirs = out_data_dirs[1:4]
-    elif step == 7:
-        create_dirs = out_data_dirs[5:]
-    else:
-        create_dirs = out_data_dirs[step - 3:]
-
-    for out_dir in create_dirs:
-        # if exists, add a date suffix to each dir?
-        #os.makedirs(out_dir, exist_ok=True)
-        os.makedirs(out_dir)
-
-    if step == 1:
-        print("STEP 1: phoneset consistency ...")
-        phoneset_consistency_check('data/01_phoneset_consistency/original_IPD_WordList_IPA_SAMPA.csv')
-        step +=1
-
-    if step == 2:
-        print("STEP 2: diphthong consistency ...")
-        diphthong_consistency_check('data/01_phoneset_consistency/IPD_IPA_consistent_aligned.csv',
-                                out_data_dirs[0] + '/IPD_IPA_diphthong_consistent.csv')
-        step += 1
-
-    if step == 3:
-        print("STEP 3: variants ...")
-        multiple_transcripts(out_data_dirs[0] + '/IPD_IPA_diphthong_consistent.csv',
-                         out_data_dirs[1])
-        step += 1
-    if step == 4:
-        print("STEP 4: postaspiration ...")
-        correct_postaspiration(out_data_dirs[1] + '/IPD_IPA_multiple_transcript_processed.csv', out_data_dirs[2])
-        step += 1
-
-    if step == 5:
-        print("STEP 5: vowel length ...")
-        vowel_length_analysis(out_data_dirs[2] + '/IPD_IPA_postaspir_corrected.csv', out_data_dirs[3])
-        step += 1
-
-    if step == 6:
-        print("STEP 6: compound analysis ...")
-        compound_analysis(out_data_dirs[2] + '/IPD_IPA_postaspir_corrected.csv', out_data_dirs[4])
+    to_step = args.to_step
+    if to_step is None:
+        # stop for the manual step after step 6
+        to_step = 6 if args.from_step <= 6 else 10
+
+    # filled below, before any step is run, if step 7 is selected
+    error_list = []
+    graph = PipelineGraph(pipeline_steps(error_list, args.processes))
+    selected = graph.select(args.from_step, to_step, args.only)
+    if not selected:
+        print('No steps selected')
+        sys.exit(1)
+    if any(node.step == 7 for node in selected):
+        error_list.extend(args.comp_errors.read().splitlines())
+
+    profiler = StepProfiler(args.profile, args.cprofile_dir)
+    try:
+        graph.run(selected, args.jobs, profiler)
+    finally:
+        profiler.report(args.profile_trace)
+
+    steps_run = set(node.step for node in selected)
+    if 6 in steps_run and 7 not in steps_run:
         print("Finished compound analysis. Please control 'IPD_IPA_multitranscr.csv' for errors."
               "\nCollect the errors into a text file and run main.py again with the arguments:\n"
               "--step 7 --comp_errors <path_to_extracted_errors>")
-        sys.exit(0)
-
-    if step == 7:
-        print("STEP 7: remove errors ...")
-        error_file = args.comp_errors
-        inp_dict = open(out_data_dirs[4] + '/IPD_IPA_compound_filtered.csv').readlines()
-        remove_list(error_file.read().splitlines(), inp_dict, out_data_dirs[4] + '/IPD_IPA_compound_filtered_final.csv')
-        step += 1
-
-    if step == 8:
-        print("STEP 8: g2p alignment ...")
-        align_g2p(out_data_dirs[4] + '/IPD_IPA_compound_filtered_final.csv', out_data_dirs[5])
-        step += 1
-
-    if step == 9:
-        print("STEP 9: comparison googlei18n suggestions ...")
-        compare_googlei18n_sugg(out_data_dirs[5] + '/IPD_IPA_align_errors_removed.csv',
-                                'data/third_party/suggestions.csv', out_data_dirs[6])
+    if 10 in steps_run:
         print("\nFinished IPD processing. To continue with g2p model training, create training and test files"
               " and run g2p_experiment.py\n")
-        exit(0)
 
 
 if __name__=='__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Scheduler for the processing steps in main.py.
+
+The pipeline is declared as a list of PipelineNodes, each node a function call with the files it reads (inputs)
+and the files it writes (outputs). A node depends on every other selected node writing one of its inputs, nodes
+without a dependency between them are run concurrently in a process pool:
+
+    1 cut columns  ->  1 IPA alignment
+                   ->  1 SAMPA alignment
+                   ->  1 IPA correction  ->  1 consistent alignment  ->  2  ->  3  ->  4  ->  5
+                                                                                          ->  6
+
+Inputs not written by any selected node have to exist before the run starts, e.g. running only step 4 requires
+the output of step 3 from an earlier run. The directories of all outputs are created before a node is run.
+
+"""
+
+import os
+import concurrent.futures
+
+from step_profiler import StepProfiler
+
+
+class PipelineNode:
+
+    def __init__(self, step, name, func, args=(), inputs=(), outputs=()):
+        """
+        :param step: the number of the processing step the node belongs to, used for the step selection
+        :param name: unique name of the node
+        :param func: a module level function, such that it can be run in another process
+        :param args: the arguments of func
+        :param inputs: files read by func, the first one is the main input of the node
+        :param outputs: files written by func, the first one is the main output of the node
+        """
+        self.step = step
+        self.name = name
+        self.func = func
+        self.args = args
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+
+    def __repr__(self):
+        return 'PipelineNode(' + str(self.step) + ', ' + self.name + ')'
+
+
+class PipelineGraph:
+
+    def __init__(self, nodes):
+        self.nodes = list(nodes)
+        names = [node.name for node in self.nodes]
+        if len(set(names)) != len(names):
+            raise ValueError('Node names are not unique: ' + str(names))
+
+    def select(self, from_step=None, to_step=None, only=None):
+        """
+        :param only: a list of step numbers, overrides from_step and to_step
+        :return: the selected nodes, in the order of declaration
+        """
+        if only:
+            return [node for node in self.nodes if node.step in only]
+        return [node for node in self.nodes
+                if (from_step is None or node.step >= from_step) and (to_step is None or node.step <= to_step)]
+
+    @staticmethod
+    def dependencies(nodes):
+        """
+        :return: a dict node name -> set of names of the nodes writing one of its inputs
+        """
+        writers = {}
+        for node in nodes:
+            for output in node.outputs:
+                writers.setdefault(output, set()).add(node.name)
+        deps = {}
+        for node in nodes:
+            deps[node.name] = set()
+            for inp in node.inputs:
+                deps[node.name].update(writers.get(inp, ()))
+            deps[node.name].discard(node.name)
+        return deps
+
+    @staticmethod
+    def missing_inputs(nodes):
+        """
+        :return: inputs of nodes neither written by one of the nodes nor existing
+        """
+        written = set(output for node in nodes for output in node.outputs)
+        return sorted(set(inp for node in nodes for inp in node.inputs
+                          if inp not in written and not os.path.exists(inp)))
+
+    def run(self, nodes, jobs=1, profiler=None):
+        """
+        Run nodes in dependency order, with at most jobs nodes at a time.
+        :param profiler: an optional StepProfiler, collects the records of all nodes
+        :return: the names of the nodes run, in the order they finished
+        """
+        missing = self.missing_inputs(nodes)
+        if missing:
+            raise FileNotFoundError('Input files missing, run the steps creating them first: ' + ', '.join(missing))
+        deps = self.dependencies(nodes)
+        if _has_cycle(deps):
+            raise ValueError('The selected pipeline steps have cyclic dependencies')
+        for node in nodes:
+            for output in node.outputs:
+                if os.path.dirname(output):
+                    os.makedirs(os.path.dirname(output), exist_ok=True)
+
+        if profiler is None:
+            profiler = StepProfiler()
+        if jobs <= 1:
+            return self._run_sequential(nodes, deps, profiler)
+        return self._run_parallel(nodes, deps, jobs, profiler)
+
+    @staticmethod
+    def _ready(pending, deps, done):
+        return [node for node in pending if deps[node.name] <= done]
+
+    def _run_sequential(self, nodes, deps, profiler):
+        done = set()
+        finished = []
+        pending = list(nodes)
+        while pending:
+            node = self._ready(pending, deps, done)[0]
+            pending.remove(node)
+            print('STEP ' + str(node.step) + ': ' + node.name + ' ...')
+            profiler.run(node.step, node.name, node.func, *node.args,
+                         inputs=node.inputs[:1], outputs=node.outputs[:1])
+            done.add(node.name)
+            finished.append(node.name)
+        return finished
+
+    def _run_parallel(self, nodes, deps, jobs, profiler):
+        done = set()
+        finished = []
+        pending = list(nodes)
+        running = {}
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+            while pending or running:
+                for node in self._ready(pending, deps, done):
+                    pending.remove(node)
+                    print('STEP ' + str(node.step) + ': ' + node.name + ' ...')
+                    child_profiler = StepProfiler(profiler.enabled, profiler.cprofile_dir, profiler.memory)
+                    running[executor.submit(_run_node, node, child_profiler)] = node
+                completed, not_done = concurrent.futures.wait(running,
+                                                              return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in completed:
+                    node = running.pop(future)
+                    # re-raises the exception of a failed node, the executor waits for the running nodes
+                    profiler.records.extend(future.result())
+                    done.add(node.name)
+                    finished.append(node.name)
+        return finished
+
+
+def _run_node(node, profiler):
+    profiler.run(node.step, node.name, node.func, *node.args, inputs=node.inputs[:1], outputs=node.outputs[:1])
+    return profiler.records
+
+
+def _has_cycle(deps):
+    done = set()
+    remaining = dict(deps)
+    while remaining:
+        ready = [name for name, node_deps in remaining.items() if node_deps <= done]
+        if not ready:
+            return True
+        for name in ready:
+            done.add(name)
+            del remaining[name]
+    return False
@@ -7,6 +7,7 @@
 
 """
 import sys
+from concurrent.futures import ProcessPoolExecutor
 import processors.grapheme_phoneme_mapping as g2p
 from dict_database import comp_dict_db
 from dict_database import pron_dict_db
@@ -21,6 +22,9 @@ TRANSCR_MAP = pron_dict_db.get_transcriptions_map()
 MIN_COMP_LEN = 4
 MIN_INDEX = 2       # the position from which to start searching for a head word
 
+# word -> tuple of (start, end) spans of its compound elements, see compound_spans()
+SPAN_MEMO = {}
+
 
 class CompoundTree:
     def __init__(self, word):
@@ -120,22 +124,22 @@ def lookup_compound_components(word, p_dict={}):
 
 def extract_compound_components(comp_tree, p_dict):
     """
-    As long as compound components can be extracted, extract compound components and their transcripts recursively.
+    As long as compound components can be extracted, extract compound components. The tree is built
+    iteratively with an explicit stack of nodes still to be divided.
 
     :param comp_tree: a tree containing one root element. If compound components are found, they are added
     as children of the root.
     :return:
     """
-    mod, head = lookup_compound_components(comp_tree.elem, p_dict)
-    if len(mod) > 0 and len(head) > 0:
-        left_elem = mod
-        left_tree = CompoundTree(left_elem)
-        comp_tree.left = left_tree
-        right_elem = head
-        right_tree = CompoundTree(right_elem)
-        comp_tree.right = right_tree
-        extract_compound_components(left_tree, p_dict)
-        extract_compound_components(right_tree, p_dict)
+    stack = [comp_tree]
+    while stack:
+        node = stack.pop()
+        mod, head = lookup_compound_components(node.elem, p_dict)
+        if len(mod) > 0 and len(head) > 0:
+            node.left = CompoundTree(mod)
+            node.right = CompoundTree(head)
+            stack.append(node.right)
+            stack.append(node.left)
 
 
 def build_compound_tree(word, p_dict={}):
@@ -149,19 +153,106 @@ def build_compound_tree(word, p_dict={}):
     return comp_tree
 
 
-def get_compounds(p_dict, g2p):
-    for word in p_dict.keys():
-        tree = build_compound_tree(word, p_dict)
-        comp_elems = []
-        tree.preorder(comp_elems)
+def compound_spans(word):
+    """
+    The compound division of word as flat spans, the same division as the leaves of build_compound_tree().
+    Since the division only depends on the word string, the spans of each word and component are memoized in
+    SPAN_MEMO: a component occurring in many compounds is only divided once.
+
+    :param word: the word to divide
+    :return: a tuple of (start, end) tuples, the positions of the compound elements in word
+    """
+    spans = SPAN_MEMO.get(word)
+    if spans is not None:
+        return spans
+
+    components = {}
+    stack = [word]
+    while stack:
+        current = stack[-1]
+        if current in SPAN_MEMO:
+            stack.pop()
+            continue
+        if current not in components:
+            components[current] = lookup_compound_components(current)
+        mod, head = components[current]
+        if len(mod) == 0 or len(head) == 0:
+            SPAN_MEMO[current] = ((0, len(current)),)
+            stack.pop()
+            continue
+        undivided = [comp for comp in (head, mod) if comp not in SPAN_MEMO]
+        if undivided:
+            stack.extend(undivided)
+            continue
+        offset = len(current) - len(head)
+        SPAN_MEMO[current] = SPAN_MEMO[mod] + tuple((start + offset, end + offset) for start, end in SPAN_MEMO[head])
+        stack.pop()
+
+    return SPAN_MEMO[word]
+
+
+def compound_elements(word):
+    """
+    :return: the list of compound elements of word, a list containing only word if it is not a compound
+    """
+    return [word[start:end] for start, end in compound_spans(word)]
+
+
+def analyse_compounds(entries, g2p_map):
+    """
+    Divide each word in entries and extract the transcripts of the compound elements. Does not change any
+    dictionary entries, such that chunks of a dictionary can be analysed in parallel.
+
+    :param entries: a list of (word, transcript) tuples
+    :param g2p_map: the grapheme-phoneme mapping to align the transcripts with
+    :return: a list of (word, compound elements, element transcript dict) tuples for each compound in entries
+    """
+    results = []
+    for word, transcr in entries:
+        comp_elems = compound_elements(word)
         if len(comp_elems) > 1:
             # align transcript using grapheme_phoneme_mapping of word and extract the transcript for each element
-            elem_dict = get_elem_transcriptions(comp_elems, p_dict[word], g2p.g2p_map)
-            p_dict[word].compound_elements = comp_elems
-            for elem in comp_elems:
-                if elem in p_dict and elem in elem_dict:
-                    p_dict[elem].frequency += 1
-                    p_dict[elem].transcript_variants.add(elem_dict[elem])
+            elem_dict = get_elem_transcriptions(comp_elems, entry.PronDictEntry(word, transcr), g2p_map)
+            results.append((word, comp_elems, elem_dict))
+    return results
+
+
+def _analyse_chunk(args):
+    return analyse_compounds(*args)
+
+
+def apply_compound_results(p_dict, results):
+    """
+    Set the compound elements of the compounds in results, and update the frequency and transcript variants
+    of the elements in p_dict.
+    :param results: the results of analyse_compounds(), in dictionary order
+    """
+    for word, comp_elems, elem_dict in results:
+        p_dict[word].compound_elements = comp_elems
+        for elem in comp_elems:
+            if elem in p_dict and elem in elem_dict:
+                p_dict[elem].frequency += 1
+                p_dict[elem].transcript_variants.add(elem_dict[elem])
+
+
+def get_compounds(p_dict, g2p, processes=1):
+    """
+    :param p_dict: a dict word -> PronDictEntry
+    :param g2p: a G2P_align object
+    :param processes: if larger than 1, the words are divided into chunks analysed in a process pool.
+    The results are applied in dictionary order, such that the result is the same as when run in one process.
+    :return: p_dict, with compound elements, frequency and transcript variants set
+    """
+    entries = [(word, p_dict[word].transcript) for word in p_dict]
+    if processes <= 1 or len(entries) < processes:
+        apply_compound_results(p_dict, analyse_compounds(entries, g2p.g2p_map))
+        return p_dict
+
+    chunk_size = -(-len(entries) // processes)
+    chunks = [(entries[first: first + chunk_size], g2p.g2p_map) for first in range(0, len(entries), chunk_size)]
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for results in executor.map(_analyse_chunk, chunks):
+            apply_compound_results(p_dict, results)
 
     return p_dict
 
@@ -188,7 +279,7 @@ def collect_multi_transcripts(pron_dict):
     return entries
 
 
-def process_dictionary(input_list):
+def process_dictionary(input_list, processes=1):
     pron_dict = {}
     for line in input_list:
         word, transcr = line.strip().split('\t')
@@ -199,7 +290,7 @@ def process_dictionary(input_list):
     g2p = G2P_align(input_list, 1000)
     g2p.extend_mapping(input_list)
 
-    pron_dict = get_compounds(pron_dict, g2p)
+    pron_dict = get_compounds(pron_dict, g2p, processes)
     return pron_dict
 
 
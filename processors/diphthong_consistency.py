@@ -39,6 +39,7 @@ Adams	aː t a m s
 
 import sys
 import re
+from processors import rule_counters
 
 # the transcription of the following words should not be treated as errors
 exception_list = ['andagift',
@@ -62,6 +63,13 @@ regex_dict = { re.compile('æ|agi'): 'ai',
                     re.compile('ogi'): 'ɔi j ɪ',
             }
 
+# rule hit counters: an entry hits a pattern rule if its word matches the pattern but the transcript does not contain
+# the expected diphthong, see processors/rule_counters.py
+COUNTERS = rule_counters.register('diphthong_consistency',
+                                  ['exception list'] + [p.pattern + ' -> ' + d for p, d in regex_dict.items()])
+EXCEPTION_ID = COUNTERS.ids('exception list')
+PATTERN_IDS = {p: COUNTERS.ids(p.pattern + ' -> ' + d) for p, d in regex_dict.items()}
+
 def find_inconsistencies(inputfile):
 
     error_list = []
@@ -82,11 +90,13 @@ def filter_consistent_transcripts(inputfile):
         error_in_entry = False
         word, transcr = line.strip().split('\t')
         if word in exception_list:
+            COUNTERS.hit(EXCEPTION_ID, line)
             new_dict.append(line.strip())
             continue
         for pattern in regex_dict.keys():
             if pattern.search(word):
                 if not re.search(regex_dict[pattern], transcr):
+                    COUNTERS.hit(PATTERN_IDS[pattern], line)
                     error_in_entry = True
 
         if not error_in_entry:
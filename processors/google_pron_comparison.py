@@ -1,63 +1,138 @@
 #!/usr/bin/env python3
 
 # Checks google file 'suggestions.csv' against an lvl version of the pron dict
+#
+# The pron dict is indexed by word once, the suggestion files are then streamed row by row with the csv module,
+# such that each suggestion is a dict lookup. Several suggestion files can be compared against the same index,
+# statistics are collected for each file.
 
 
 import sys
+import csv
+
+# columns of the googlei18n suggestions file: <id>,<word>,,<ipa in IPD>,<suggested ipa>,...
+WORD_COL = 1
+TRANSCR_COL = 3
+
+
+class SuggestionComparison:
+
+    def __init__(self, pron_dict_lines):
+        # word -> list of (line index, transcript without spaces)
+        self.pron_dict = {}
+        self.lines = []
+        self.matched = set()
+        self.statistics = {}
+
+        for line in pron_dict_lines:
+            line = line.strip()
+            if not line:
+                continue
+            word, transcr_aligned = line.split('\t')
+            transcr = transcr_aligned.replace(' ', '')
+            self.pron_dict.setdefault(word, []).append((len(self.lines), transcr))
+            self.lines.append(line)
+
+    @classmethod
+    def from_file(cls, ipd_file):
+        with open(ipd_file) as f:
+            return cls(f)
+
+    def __contains__(self, word):
+        return word in self.pron_dict
+
+    @staticmethod
+    def read_suggestions(sugg_file, word_col=WORD_COL, transcr_col=TRANSCR_COL):
+        """
+        :return: a generator of (word, transcript) tuples from sugg_file, rows with too few columns are skipped
+        """
+        with open(sugg_file, newline='') as f:
+            for row in csv.reader(f):
+                if len(row) > max(word_col, transcr_col):
+                    yield row[word_col], row[transcr_col]
+
+    def compare(self, sugg_file, word_col=WORD_COL, transcr_col=TRANSCR_COL):
+        """
+        Find the entries of the pron dict having the same transcript as a suggestion in sugg_file, i.e.
+        the transcript marked as erroneous by the suggestion.
+
+        :param sugg_file: a csv file containing words and their IPD transcripts
+        :return: the indices of the matching entries, in pron dict order
+        """
+        stats = {'suggestions': 0, 'words_in_dict': 0, 'transcripts_in_dict': 0}
+        matched = set()
+        for word, transcr in self.read_suggestions(sugg_file, word_col, transcr_col):
+            stats['suggestions'] += 1
+            entries = self.pron_dict.get(word)
+            if entries is None:
+                continue
+            stats['words_in_dict'] += 1
+            for ind, dict_transcr in entries:
+                if dict_transcr == transcr:
+                    stats['transcripts_in_dict'] += 1
+                    matched.add(ind)
+
+        stats['matched_entries'] = len(matched)
+        self.statistics[sugg_file] = stats
+        self.matched.update(matched)
+        return sorted(matched)
+
+    def compare_all(self, sugg_files):
+        """
+        Compare all suggestion files against the pron dict.
+        :param sugg_files: a list of file names, or of (file name, word column, transcript column) tuples
+        :return: the entries matching a suggestion in any of the files, in pron dict order
+        """
+        for sugg in sugg_files:
+            if isinstance(sugg, str):
+                self.compare(sugg)
+            else:
+                self.compare(*sugg)
+        return self.errors()
+
+    def errors(self):
+        return [self.lines[ind] for ind in sorted(self.matched)]
+
+    def statistics_report(self):
+        report = []
+        for source, stats in self.statistics.items():
+            report.append(source + ': ' + str(stats['suggestions']) + ' suggestions, ' +
+                          str(stats['words_in_dict']) + ' words in dictionary, ' +
+                          str(stats['matched_entries']) + ' entries with suggested errors')
+        return report
 
-def compare_words(ipd_file, googlei18n_suggestion_file):
-
-    google_list = []
-    pron_dict = []
-
-    for line in open(googlei18n_suggestion_file).readlines():
-        arr = line.split(',')
-        google_list.append(arr[1])
 
-    for line in open(ipd_file).readlines():
-        word, transcr = line.split('\t')
-        pron_dict.append(word)
+def compare_words(ipd_file, googlei18n_suggestion_file):
 
-    still_in_dict = [x for x in google_list if x in pron_dict]
+    comparison = SuggestionComparison.from_file(ipd_file)
+    still_in_dict = [word for word, transcr in SuggestionComparison.read_suggestions(googlei18n_suggestion_file)
+                     if word in comparison]
 
     return still_in_dict
 
 def compare_words_with_transcr(ipd_file, googlei18n_suggestion_file):
 
-    google_dict = {}
-    errors_in_dict = []
-
-    for line in open(googlei18n_suggestion_file).readlines():
-        arr = line.split(',')
-        word = arr[1]
-        transcr = arr[3]
-        if word in google_dict:
-            google_dict[word].append(transcr)
-        else:
-            google_dict[word] = [transcr]
-
-    for line in open(ipd_file).readlines():
-        word, transcr_aligned = line.split('\t')
-        transcr = transcr_aligned.replace(' ', '').strip()
-        if word in google_dict:
-            if transcr in google_dict[word]:
-                errors_in_dict.append(line.strip())
+    comparison = SuggestionComparison.from_file(ipd_file)
+    comparison.compare(googlei18n_suggestion_file)
 
-    return errors_in_dict
+    return comparison.errors()
 
 
 def main():
 
     ipd_in = sys.argv[1]
-    googlei18n_in = sys.argv[2]
+    googlei18n_in = sys.argv[2:]
 
     #result = compare_words(ipd_in, googlei18n_in)
 
-    compare_words_with_transcr(ipd_in, googlei18n_in)
+    comparison = SuggestionComparison.from_file(ipd_in)
+    comparison.compare_all(googlei18n_in)
+    for line in comparison.statistics_report():
+        print(line)
 
     #for res in result:
     #    print(res)
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
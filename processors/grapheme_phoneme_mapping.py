@@ -323,6 +323,16 @@ def align_g2p(word, transcript, g2p_map):
 def process_dictionary(inputfile, min_occur=1000):
 
     pron_dict_in = open(inputfile).readlines()
+    return process_entries(pron_dict_in, min_occur)
+
+
+def process_entries(pron_dict_in, min_occur=1000):
+    """
+    Same as process_dictionary(), for a dictionary already in memory.
+    :param pron_dict_in: list of dictionary lines, 'word\tt r a n s c r i p t'
+    :param min_occur: mappings occurring more often than min_occur are used as initial anchors for the alignment
+    :return: a list of all g2p mappings with frequencies, and a list of entries containing low frequency mappings
+    """
     g2p = G2P_align(pron_dict_in, min_occur)
     g2p.extend_mapping(pron_dict_in)
 
@@ -9,10 +9,108 @@ Note that the transcriptions have to be aligned - no attempt is made to identify
 combined phonetic symbols. It is assumed that the words and their transcriptions are separated by tab
 and that the symbols in the transcriptions are separated by a space
 
+The conversion is done on phone IDs (see pron_dict/lexicon.py): the symbol map is compiled into a lookup table
+indexed by source phone ID, containing the target phone ID. The converter of the opposite direction is
+derived from the same symbol map, so a dictionary can be converted to X-SAMPA and back in memory.
+
 """
 
 import sys
 import argparse
+from array import array
+from collections import namedtuple
+
+from pron_dict.lexicon import Lexicon, PhoneInventory
+
+# lookup table value for source phones not in the symbol map
+UNMAPPED = 0xFFFF
+
+# a symbol in the transcript of word that could not be converted
+UnmappedSymbol = namedtuple('UnmappedSymbol', ['word', 'symbol', 'transcript'])
+
+
+class TranscriptionConverter:
+    """
+    Converts phone ID arrays from one phone inventory to another by a lookup table.
+
+    The table is compiled lazily: phones added to the source inventory after creating the converter are
+    looked up in the symbol map the first time they are seen.
+    """
+
+    def __init__(self, transcr_map, source_inventory=None, target_inventory=None):
+        self.transcr_map = dict(transcr_map)
+        self.source = source_inventory if source_inventory is not None else PhoneInventory()
+        self.target = target_inventory if target_inventory is not None else PhoneInventory()
+        self.table = array('H')
+        self._compile()
+
+    def _compile(self):
+        for phone in self.source.symbols[len(self.table):]:
+            if phone in self.transcr_map:
+                self.table.append(self.target.intern(self.transcr_map[phone]))
+            else:
+                self.table.append(UNMAPPED)
+
+    def inverse(self):
+        """
+        :return: a converter for the opposite direction, sharing the phone inventories of this converter
+        """
+        inverse_map = {value: key for key, value in self.transcr_map.items()}
+        return TranscriptionConverter(inverse_map, self.target, self.source)
+
+    def convert_ids(self, phone_ids):
+        """
+        :param phone_ids: phone IDs of the source inventory
+        :return: an array of target phone IDs, UNMAPPED for each phone not in the symbol map
+        """
+        if len(self.table) < len(self.source):
+            self._compile()
+        table = self.table
+        return array('H', [table[p] for p in phone_ids])
+
+    def convert_lexicon(self, lexicon):
+        """
+        Convert all transcripts of lexicon. Entries containing symbols not in the symbol map are not
+        added to the result but reported as errors.
+
+        :param lexicon: a Lexicon using the source inventory of this converter
+        :return: the converted Lexicon (target inventory) and a list of UnmappedSymbol
+        """
+        if lexicon.inventory is not self.source:
+            raise ValueError('Lexicon does not use the source inventory of the converter')
+
+        converted = self.convert_ids(lexicon.phones)
+        result = Lexicon(self.target)
+        errors = []
+
+        unmapped_ids = set(ind for ind, target_id in enumerate(self.table) if target_id == UNMAPPED)
+        if not unmapped_ids or unmapped_ids.isdisjoint(lexicon.phones):
+            # fast path, no errors: keep the word list and the offsets
+            result.words = list(lexicon.words)
+            result.phones = converted
+            result.offsets = array('L', lexicon.offsets)
+            return result, errors
+
+        for ind, word in enumerate(lexicon.words):
+            start, end = lexicon.span(ind)
+            entry_ids = converted[start:end]
+            if UNMAPPED in entry_ids:
+                for phone_id in lexicon.phones[start:end]:
+                    if phone_id in unmapped_ids:
+                        errors.append(UnmappedSymbol(word, self.source.symbol(phone_id), lexicon.transcript(ind)))
+            else:
+                result.append(word, entry_ids)
+
+        return result, errors
+
+    def convert_lines(self, dict_lines):
+        """
+        :param dict_lines: dictionary lines, 'word\tt r a n s c r i p t'
+        :return: a list of converted dictionary lines and a list of UnmappedSymbol
+        """
+        lexicon = Lexicon.from_lines(dict_lines, self.source)
+        converted, errors = self.convert_lexicon(lexicon)
+        return list(converted.lines()), errors
 
 
 def create_transcription_map(mapping_file):
@@ -25,24 +123,26 @@ def create_transcription_map(mapping_file):
     return transcr_map
 
 
-def transcribe_dictionary(dict_file, transcr_map):
-
-    transcribed_dict = []
+def load_converter(mapping_filename):
+    """
+    :param mapping_filename: a symbol map file, e.g. data/00_phonesets/ipa_xsampa.txt
+    :return: a TranscriptionConverter for the direction of the symbol map, use inverse() for the other direction
+    """
+    with open(mapping_filename) as f:
+        return TranscriptionConverter(create_transcription_map(f))
 
-    for line in dict_file.readlines():
-        error_in_transcript = False
-        word, transcr = line.split('\t')
-        transcr_arr = transcr.strip().split()
 
-        for ind, item in enumerate(transcr_arr):
-            if item in transcr_map:
-                transcr_arr[ind] = transcr_map[item]
-            else:
-                print(item + ' - ' + line.strip())
-                error_in_transcript = True
+def transcribe_dictionary(dict_file, transcr_map, errors=None):
+    """
+    :param dict_file: an open dictionary file
+    :param transcr_map: symbol map, see create_transcription_map()
+    :param errors: optional list, UnmappedSymbol for each symbol not in transcr_map are added to this list
+    :return: a list of converted dictionary lines, entries with unmapped symbols are skipped
+    """
 
-        if not error_in_transcript:
-            transcribed_dict.append(word + '\t' + ' '.join(transcr_arr))
+    transcribed_dict, unmapped = TranscriptionConverter(transcr_map).convert_lines(dict_file)
+    if errors is not None:
+        errors.extend(unmapped)
 
     return transcribed_dict
 
@@ -62,7 +162,11 @@ def main():
 
     transcription_map = create_transcription_map(args.d)
 
-    transcribed_dict = transcribe_dictionary(args.i, transcription_map)
+    errors = []
+    transcribed_dict = transcribe_dictionary(args.i, transcription_map, errors)
+
+    for err in errors:
+        print(err.symbol + ' - ' + err.word + '\t' + err.transcript, file=sys.stderr)
 
     for line in transcribed_dict:
         args.o.write(line + '\n')
@@ -58,6 +58,7 @@ Collect entries containing '0', '_'
 
 import sys
 import os
+from processors import rule_counters
 
 non_valid_symbols = {'b': 'p',
                      'd': 't',
@@ -107,6 +108,19 @@ dict_out = []
 
 UNKNOWN = 'UNKNOWN'
 
+# rule hit counters, one rule per symbol, see processors/rule_counters.py
+SYMBOL_RULES = [(sym, sym + ' -> ' + repl) for sym, repl in non_valid_symbols.items()] + \
+               [(sym, sym + ' removed') for sym in symbols_to_remove] + \
+               [(sym, "'" + sym + "' rejected") for sym in separation_symbols + unknown_errors]
+CONTEXT_RULES = [(sym, sym + ' -> ' + tup[0] + ' (not ' + tup[1] + ')') for sym, tup in context_dependent_symbols.items()]
+DIPHTHONG_RULES = [(diph, diph + ' -> ' + repl) for diph, repl in diphthongs_w_length.items()]
+
+COUNTERS = rule_counters.register('ipa_corrector',
+                                  [rule for sym, rule in CONTEXT_RULES + DIPHTHONG_RULES + SYMBOL_RULES])
+SYMBOL_IDS = {sym: COUNTERS.ids(rule) for sym, rule in SYMBOL_RULES}
+CONTEXT_IDS = {sym: COUNTERS.ids(rule) for sym, rule in CONTEXT_RULES}
+DIPHTHONG_IDS = {diph: COUNTERS.ids(rule) for diph, rule in DIPHTHONG_RULES}
+
 
 def validate_phonemes(phone_str):
     if phone_str in non_valid_symbols:
@@ -138,6 +152,7 @@ def context_dependent_error(phone_str):
 
             else:
                 correction = phone_str[:i] + tup[0] + phone_str[i+1:]
+                COUNTERS.hit(CONTEXT_IDS[c], phone_str)
                 corrected_context_dep.append(phone_str + '\t' + correction)
                 return correction
 
@@ -146,7 +161,9 @@ def context_dependent_error(phone_str):
 
 def correct_diphthongs(phone_string):
     for elem in diphthongs_w_length.keys():
-        phone_string = phone_string.replace(elem, diphthongs_w_length[elem])
+        if elem in phone_string:
+            COUNTERS.hit(DIPHTHONG_IDS[elem], phone_string)
+            phone_string = phone_string.replace(elem, diphthongs_w_length[elem])
 
     return phone_string
 
@@ -158,11 +175,14 @@ def correct_transcript(phone_string):
     while offset < len(phone_string):
         repl_len = 0
         while l > 0:
-            repl, repl_len = validate_phonemes(phone_string[offset: offset + l])
+            phone_str = phone_string[offset: offset + l]
+            repl, repl_len = validate_phonemes(phone_str)
             if repl == UNKNOWN:
+                COUNTERS.hit(SYMBOL_IDS[phone_str], phone_string)
                 unknown.append(phone_string)
                 return phone_string, repl
-            elif repl != phone_string[offset: offset + l]:
+            elif repl != phone_str:
+                COUNTERS.hit(SYMBOL_IDS[phone_str], phone_string)
                 phone_string = phone_string[: offset] + repl + phone_string[offset + repl_len:]
                 if repl_len > 1:
                     offset += repl_len - 1
@@ -2,14 +2,17 @@
 
 # Where are length symbols used in the pron dictionary?
 # Collect all transcripts with length symbols that are not only at the first vowel
+#
+# analyse_length_symbols() processes one line at a time, so the dictionary can be streamed from file
+# without loading it into memory.
 
 import sys
 
-XSAMPA_VOWELS = ['a', 'a:', 'ai', 'au', 'au:', 'ei', 'ei:', 'i', 'i:', 'ou', 'ou:', 'u', 'u:', '9', '9:' ,'9Y', '9Y:',
-          'O', 'Oi', 'O:', 'E', 'E:', 'I', 'I:', 'Y', 'Y:' 'Yi']
+XSAMPA_VOWELS = frozenset(['a', 'a:', 'ai', 'ai:', 'au', 'au:', 'ei', 'ei:', 'i', 'i:', 'ou', 'ou:', 'u', 'u:',
+                           '9', '9:', '9Y', '9Y:', 'O', 'Oi', 'O:', 'E', 'E:', 'I', 'I:', 'Y', 'Y:', 'Yi'])
 
-IPA_VOWELS = ['a', 'aː', 'ai', 'au', 'auː', 'ei', 'eiː', 'i', 'iː', 'ou', 'ouː', 'u', 'uː', 'œ', 'œː' ,'œy', 'œyː',
-          'ɔ', 'ɔi', 'ɔː', 'ɛ', 'ɛː', 'ɪ', 'ɪː', 'ʏ', 'ʏː' 'ʏi']
+IPA_VOWELS = frozenset(['a', 'aː', 'ai', 'aiː', 'au', 'auː', 'ei', 'eiː', 'i', 'iː', 'ou', 'ouː', 'u', 'uː',
+                        'œ', 'œː', 'œy', 'œyː', 'ɔ', 'ɔi', 'ɔː', 'ɛ', 'ɛː', 'ɪ', 'ɪː', 'ʏ', 'ʏː', 'ʏi'])
 
 XSAMPA_LENGTH_SYMBOL = ':'
 IPA_LENGTH_SYMBOL = 'ː'
@@ -28,36 +31,40 @@ def set_length_symbol(transcr_set_ipa):
         len_sym = XSAMPA_LENGTH_SYMBOL
     return len_sym
 
-def remove_all_length_symbols(phon_arr, vowel_set, length_symbol):
+def analyse_length_symbols(pron_dict, ipa=True):
+    """
+    Single pass over pron_dict: remove all length symbols from the transcripts and detect length symbols
+    after the first vowel.
 
-    for ind, phon in enumerate(phon_arr):
-        if phon in vowel_set and length_symbol in phon:
-            phon = phon.replace(length_symbol, '')
-            phon_arr[ind] = phon
-
-    new_transcr = ' '.join(phon_arr)
-
-    return new_transcr
-
-
-def find_length_symbol_after_1st(pron_dict, ipa=True):
+    :param pron_dict: an iterable of dictionary lines, e.g. an open file
+    :param ipa: True if the transcripts are IPA, False for X-SAMPA
+    :return: a generator of (line, line without length symbols, has length symbol after 1st vowel) tuples
+    """
     vowels = set_vowels(ipa)
     length_symbol = set_length_symbol(ipa)
 
-    length_symbol_transcripts = []
     for line in pron_dict:
-        word, transcr = line.strip().split('\t')
+        line = line.strip()
+        if not line:
+            continue
+        word, transcr = line.split('\t')
         t_arr = transcr.split()
         vowel_seen = False
-        for phon in t_arr:
+        late_length_symbol = False
+        for ind, phon in enumerate(t_arr):
             if phon in vowels:
-                if vowel_seen and length_symbol in phon:
-                    length_symbol_transcripts.append(line.strip())
-                    break
-                else:
-                    vowel_seen = True
+                if length_symbol in phon:
+                    if vowel_seen:
+                        late_length_symbol = True
+                    t_arr[ind] = phon.replace(length_symbol, '')
+                vowel_seen = True
 
-    return length_symbol_transcripts
+        yield line, word + '\t' + ' '.join(t_arr), late_length_symbol
+
+
+def find_length_symbol_after_1st(pron_dict, ipa=True):
+
+    return [line for line, no_len, late_length in analyse_length_symbols(pron_dict, ipa) if late_length]
 
 
 def remove_late_length_symbols(phon_arr, vowel_set, length_symbol):
@@ -74,17 +81,8 @@ def remove_late_length_symbols(phon_arr, vowel_set, length_symbol):
     return new_transcr
 
 def remove_length_symbols_from_dict(inp_dict, ipa=True):
-    vowels = set_vowels(ipa)
-    length_symbol = set_length_symbol(ipa)
-
-    results = []
-    for line in inp_dict:
-        word, transcr = line.strip().split('\t')
-        t_arr = transcr.split()
-
-        results.append(word + '\t' + remove_all_length_symbols(t_arr, vowels, length_symbol))
 
-    return results
+    return [no_len for line, no_len, late_length in analyse_length_symbols(inp_dict, ipa)]
 
 
 def main():
@@ -96,7 +94,7 @@ def main():
     #for line in results:
     #    print(line)
 
-    results = find_length_symbol_after_1st(pron_dict, IPA_VOWELS, IPA_LENGTH_SYMBOL)
+    results = find_length_symbol_after_1st(pron_dict)
 
     for line in results:
         print(line)
@@ -9,6 +9,16 @@ Takes a pronunciation dictionary as an input.
 """
 import sys
 import re
+from processors import rule_counters
+
+# rule hit counters for the branches of MultipleTranscripts._choose_transcript(), '1' and '2' denote the position
+# of the preferred transcript in the compared pair, see processors/rule_counters.py
+CHOICE_RULES = ['identical', 'k over x 1', 'k over x 2', 'voiceless over voiced 1', 'voiceless over voiced 2',
+                'll before vowel: keep both', 'l̥ or t over l 1', 'l̥ or t over l 2', 'c or h k over k or x 1',
+                'c or h k over k or x 2', 'no choice']
+COUNTERS = rule_counters.register('multiple_transcripts', CHOICE_RULES)
+IDENTICAL, K_OVER_X_1, K_OVER_X_2, VOICELESS_1, VOICELESS_2, LL_KEEP_BOTH, LL_VOICELESS_1, LL_VOICELESS_2, \
+    PALATAL_1, PALATAL_2, NO_CHOICE = COUNTERS.ids(*CHOICE_RULES)
 
 
 class MultipleTranscripts:
@@ -72,32 +82,44 @@ class MultipleTranscripts:
         # return either the preferred transcript or a KEEP_BOTH or NO_CHOICE variable
 
         if transcr1 == transcr2:
+            COUNTERS.hit(IDENTICAL, word)
             return transcr1
 
         if ('k', 'x') in result_arr:
+            COUNTERS.hit(K_OVER_X_1, word)
             return transcr1
         if ('x', 'k') in result_arr:
+            COUNTERS.hit(K_OVER_X_2, word)
             return transcr2
         if ('n̥', 'n') in result_arr or ('ŋ̊', 'ŋ') in result_arr or ('ɲ̊', 'ɲ') in result_arr or ('m̥', 'm') in result_arr or ('r̥', 'r') in result_arr:
+            COUNTERS.hit(VOICELESS_1, word)
             return transcr1
         if ('n','n̥') in result_arr or ('ŋ', 'ŋ̊') in result_arr or ('ɲ', 'ɲ̊') in result_arr or ('m', 'm̥') in result_arr or ('r', 'r̥') in result_arr:
+            COUNTERS.hit(VOICELESS_2, word)
             return transcr2
         if ('l̥', 'l') in result_arr or ('t', '') in result_arr:
             if re.match('.+ll[aáeéiíoóuúyýöæ].*', word):
+                COUNTERS.hit(LL_KEEP_BOTH, word)
                 return self.KEEP_BOTH
             else:
+                COUNTERS.hit(LL_VOICELESS_1, word)
                 return transcr1
         if ('l', 'l̥') in result_arr or ('', 't') in result_arr:
             if re.match('.+ll[aáeéiíoóuúyýöæ].*', word):
+                COUNTERS.hit(LL_KEEP_BOTH, word)
                 return self.KEEP_BOTH
             else:
+                COUNTERS.hit(LL_VOICELESS_2, word)
                 return transcr2
         if ('c', 'k') in result_arr or ('h k', 'x') in result_arr or ('', 'k') in result_arr:
+            COUNTERS.hit(PALATAL_1, word)
             return transcr1
         if ('k', 'c') in result_arr or ('x', 'h k') in result_arr or ('k', '') in result_arr:
+            COUNTERS.hit(PALATAL_2, word)
             return transcr2
 
         else:
+            COUNTERS.hit(NO_CHOICE, word)
             return self.NO_CHOICE
 
 
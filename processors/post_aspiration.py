@@ -5,6 +5,11 @@
 # Input file format: <word>\t<ipa-transcript>[further columns not considered]
 
 import sys, csv, re
+from processors import rule_counters
+
+# rule hit counters for the corrections of ensure_postaspir(), see processors/rule_counters.py
+COUNTERS = rule_counters.register('post_aspiration', ['p -> pʰ', 't -> tʰ', 'k -> kʰ', 'hv: k -> kʰ', 'c -> cʰ'])
+P_ASPIR, T_ASPIR, K_ASPIR, HV_ASPIR, C_ASPIR = COUNTERS.ids('p -> pʰ', 't -> tʰ', 'k -> kʰ', 'hv: k -> kʰ', 'c -> cʰ')
 
 
 def write_list(filename, list2write):
@@ -99,22 +104,32 @@ def ensure_postaspir(input_file):
         if re.match('[pP][aeiouyáéíóúýöæjlrv].*', word):
             if not re.match('pʰ.+', transcr):
                 new_ipa = transcr.replace('p', 'pʰ', 1)
+                if new_ipa != transcr:
+                    COUNTERS.hit(P_ASPIR, line)
                 transcr = new_ipa
         if re.match('[tT][aeiouyáéíóúýöæjrv].*', word):
             if not re.match('tʰ.+', transcr):
                 new_ipa = transcr.replace('t', 'tʰ', 1)
+                if new_ipa != transcr:
+                    COUNTERS.hit(T_ASPIR, line)
                 transcr = new_ipa
         if re.match('[kK][aouáóúölrv].*', word):
             if not re.match('kʰ.+', transcr):
                 new_ipa = transcr.replace('k', 'kʰ', 1)
+                if new_ipa != transcr:
+                    COUNTERS.hit(K_ASPIR, line)
                 transcr = new_ipa
         if re.match('[hH]v[aeiouyáéíóúýöæ].*', word):
             if not re.match('kʰ.+', transcr):
                 new_ipa = transcr.replace('k', 'kʰ', 1)
+                if new_ipa != transcr:
+                    COUNTERS.hit(HV_ASPIR, line)
                 transcr = new_ipa
         if re.match('[kK][eiéíyýæj].*', word):
             if not re.match('cʰ.+', transcr):
                 new_ipa = transcr.replace('c', 'cʰ', 1)
+                if new_ipa != transcr:
+                    COUNTERS.hit(C_ASPIR, line)
                 transcr = new_ipa
 
         #print(word + '\t' + transcr.strip())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+"""
+Hit counters for the correction and filtering rules of the processors.
+
+Each processor registers its rules once, at import time, and gets a RuleCounters object. The rules are numbered
+in the order of registration, the processor keeps the rule ids and calls hit(rule_id, example) each time a rule
+fires. A hit only increments a preallocated counter and stores the example object (e.g. the dictionary line) if it
+is the first hit of the rule, no strings are built while processing.
+
+The reports show for each rule the number of hits and the first example, including rules never firing:
+
+    rule                    hits    example
+    replace b               12      blaðra	b l a ð r a
+    replace A               0
+
+Usage in a processor:
+
+    COUNTERS = rule_counters.register('post_aspiration', ['p -> pʰ', 't -> tʰ'])
+    P_ASPIR, T_ASPIR = COUNTERS.ids('p -> pʰ', 't -> tʰ')
+    ...
+    COUNTERS.hit(P_ASPIR, line)
+
+"""
+
+REGISTRY = {}
+
+
+class RuleCounters:
+
+    def __init__(self, name, rules):
+        """
+        :param name: name of the processor, used for the report file names
+        :param rules: list of rule names, the index of a rule in the list is its id
+        """
+        self.name = name
+        self.rules = list(rules)
+        self.rule_ids = {rule: ind for ind, rule in enumerate(self.rules)}
+        if len(self.rule_ids) != len(self.rules):
+            raise ValueError('Duplicate rule names for ' + name)
+        self.counts = [0] * len(self.rules)
+        self.examples = [None] * len(self.rules)
+
+    def ids(self, *rules):
+        """
+        :return: the ids of rules, one id if only one rule is given
+        """
+        if len(rules) == 1:
+            return self.rule_ids[rules[0]]
+        return tuple(self.rule_ids[rule] for rule in rules)
+
+    def hit(self, rule_id, example=None):
+        self.counts[rule_id] += 1
+        if self.examples[rule_id] is None:
+            self.examples[rule_id] = example
+
+    def reset(self):
+        self.counts = [0] * len(self.rules)
+        self.examples = [None] * len(self.rules)
+
+    def never_fired(self):
+        return [rule for rule, count in zip(self.rules, self.counts) if count == 0]
+
+    def report_lines(self):
+        """
+        :return: tab separated lines 'rule\thits\texample', in the order of registration
+        """
+        lines = []
+        for rule, count, example in zip(self.rules, self.counts, self.examples):
+            example = '' if example is None else str(example).strip().replace('\t', ' ')
+            lines.append(rule + '\t' + str(count) + '\t' + example)
+        return lines
+
+    def write_report(self, filename):
+        with open(filename, 'w') as f:
+            f.write('rule\thits\texample\n')
+            for line in self.report_lines():
+                f.write(line + '\n')
+
+
+def register(name, rules):
+    """
+    Create the counters for the rules of processor name. Registering a name again replaces its counters.
+    :return: the RuleCounters of the processor
+    """
+    counters = RuleCounters(name, rules)
+    REGISTRY[name] = counters
+    return counters
+
+
+def reset(name):
+    REGISTRY[name].reset()
+
+
+def reset_all():
+    for counters in REGISTRY.values():
+        counters.reset()
+
+
+def write_report(name, out_dir):
+    """
+    Write the report of processor name to out_dir/<name>_rule_hits.txt
+    """
+    REGISTRY[name].write_report(out_dir + '/' + name + '_rule_hits.txt')
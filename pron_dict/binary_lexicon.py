@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Binary, memory-mappable format for pronunciation dictionaries, e.g. data/08_final_version/IPD_IPA_clean.csv or
+the train/dev/test sets.
+
+Once written, a dictionary can be opened without parsing any text: the reader mmaps the file and looks words up
+by binary search on the sorted word table (O(log n)), only the touched pages are read from disk.
+
+File layout (all sections 8 byte aligned, arrays in the byte order given in the header):
+
+    header          magic, byte order, number of entries, number of phones, section table
+    inventory       for each phone: length (1 byte), utf-8 symbol, feature bitmask (1 byte), see lexicon.py
+    word offsets    uint32 * (n + 1), offsets into the word blob
+    word blob       utf-8 encoded words, sorted by their byte representation
+    phone offsets   uint32 * (n + 1), offsets into the phone blob
+    phone blob      uint16 phone IDs
+    optional columns:
+    syll offsets    uint32 * (n + 1), offsets into the syllable blob
+    syll blob       uint16 syllable start indices, relative to the start of the transcript of the entry
+    stress blob     uint8 stress value for each syllable in the syllable blob
+    pos index       uint8 * n, index into the pos table
+    pos table       newline separated part-of-speech tags
+
+Usage:
+
+    python3 -m pron_dict.binary_lexicon data/08_final_version/IPD_IPA_clean.csv IPD_IPA_clean.lex
+
+"""
+
+import sys
+import mmap
+import struct
+from array import array
+
+from pron_dict.lexicon import Lexicon, PhoneInventory
+
+MAGIC = b'IPDLEX\x00\x01'
+ALIGNMENT = 8
+
+# section ids, the order of the section table in the header
+INVENTORY = 0
+WORD_OFFSETS = 1
+WORD_BLOB = 2
+PHONE_OFFSETS = 3
+PHONE_BLOB = 4
+SYLL_OFFSETS = 5
+SYLL_BLOB = 6
+STRESS_BLOB = 7
+POS_INDEX = 8
+POS_TABLE = 9
+NUMBER_OF_SECTIONS = 10
+
+# magic, byte order ('l' or 'b'), entries, phones, and (offset, length) for each section
+HEADER_FORMAT = '<8scxxxII' + 'QQ' * NUMBER_OF_SECTIONS
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+
+def _padding(length):
+    return b'\x00' * (-length % ALIGNMENT)
+
+
+def _encode_inventory(inventory):
+    data = bytearray()
+    for phone_id, phone in enumerate(inventory.symbols):
+        encoded = phone.encode('utf-8')
+        data.append(len(encoded))
+        data.extend(encoded)
+        data.append(inventory.features[phone_id])
+    return bytes(data)
+
+
+def _decode_inventory(data, size):
+    inventory = PhoneInventory()
+    pos = 0
+    for i in range(size):
+        length = data[pos]
+        phone = bytes(data[pos + 1: pos + 1 + length]).decode('utf-8')
+        phone_id = inventory.intern(phone)
+        inventory.features[phone_id] = data[pos + 1 + length]
+        pos += length + 2
+    return inventory
+
+
+def write_lexicon(filename, lexicon, syllables=None, stress=None, pos=None):
+    """
+    Write lexicon to filename in the binary format. The entries are sorted by word, entries of the same word keep
+    their relative order.
+
+    :param filename: the output file
+    :param lexicon: a Lexicon
+    :param syllables: optional, for each entry a list of syllable start indices (phone index in the entry)
+    :param stress: optional, for each entry a list of stress values, one for each syllable. Requires syllables.
+    :param pos: optional, for each entry its part-of-speech tag
+    """
+    if stress is not None and syllables is None:
+        raise ValueError('Stress column requires syllable column')
+
+    encoded_words = [w.encode('utf-8') for w in lexicon.words]
+    order = sorted(range(len(lexicon)), key=lambda i: encoded_words[i])
+
+    word_offsets = array('I', [0])
+    word_blob = bytearray()
+    phone_offsets = array('I', [0])
+    phone_blob = array('H')
+    for i in order:
+        word_blob.extend(encoded_words[i])
+        word_offsets.append(len(word_blob))
+        start, end = lexicon.span(i)
+        phone_blob.extend(lexicon.phones[start:end])
+        phone_offsets.append(len(phone_blob))
+
+    sections = [b''] * NUMBER_OF_SECTIONS
+    sections[INVENTORY] = _encode_inventory(lexicon.inventory)
+    sections[WORD_OFFSETS] = word_offsets.tobytes()
+    sections[WORD_BLOB] = bytes(word_blob)
+    sections[PHONE_OFFSETS] = phone_offsets.tobytes()
+    sections[PHONE_BLOB] = phone_blob.tobytes()
+
+    if syllables is not None:
+        syll_offsets = array('I', [0])
+        syll_blob = array('H')
+        stress_blob = array('B')
+        for i in order:
+            syll_blob.extend(syllables[i])
+            syll_offsets.append(len(syll_blob))
+            if stress is not None:
+                if len(stress[i]) != len(syllables[i]):
+                    raise ValueError('Stress and syllables do not match for ' + lexicon.words[i])
+                stress_blob.extend(stress[i])
+        sections[SYLL_OFFSETS] = syll_offsets.tobytes()
+        sections[SYLL_BLOB] = syll_blob.tobytes()
+        sections[STRESS_BLOB] = stress_blob.tobytes()
+
+    if pos is not None:
+        pos_table = sorted(set(pos))
+        pos_ids = {tag: ind for ind, tag in enumerate(pos_table)}
+        sections[POS_INDEX] = array('B', [pos_ids[pos[i]] for i in order]).tobytes()
+        sections[POS_TABLE] = '\n'.join(pos_table).encode('utf-8')
+
+    section_table = []
+    offset = HEADER_SIZE
+    for data in sections:
+        section_table.extend([offset, len(data)])
+        offset += len(data) + len(_padding(len(data)))
+
+    byteorder = b'l' if sys.byteorder == 'little' else b'b'
+    header = struct.pack(HEADER_FORMAT, MAGIC, byteorder, len(lexicon), len(lexicon.inventory), *section_table)
+    with open(filename, 'wb') as f:
+        f.write(header)
+        for data in sections:
+            f.write(data)
+            f.write(_padding(len(data)))
+
+
+def write_dictionary_file(inputfile, outputfile):
+    """
+    Convert a tab separated dictionary file to the binary format.
+    """
+    write_lexicon(outputfile, Lexicon.from_file(inputfile))
+
+
+class BinaryLexicon:
+    """
+    Read-only access to a lexicon in the binary format. The file is memory mapped, words are looked up
+    by binary search in the sorted word table.
+
+        with BinaryLexicon('IPD_IPA_clean.lex') as lex:
+            lex.lookup('hestur')                    # ['h ɛ s t ʏ r']
+            for word, transcr in lex.iter_prefix('hest'):
+                ...
+    """
+
+    def __init__(self, filename):
+        self._file = open(filename, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+        header = struct.unpack_from(HEADER_FORMAT, self._mmap, 0)
+        magic, byteorder, self.size, inventory_size = header[:4]
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(filename + ' is not a binary lexicon')
+        if byteorder != (b'l' if sys.byteorder == 'little' else b'b'):
+            self.close()
+            raise ValueError(filename + ' was written on a machine with a different byte order')
+        self._sections = [(header[4 + 2 * i], header[5 + 2 * i]) for i in range(NUMBER_OF_SECTIONS)]
+
+        self.inventory = _decode_inventory(self._section(INVENTORY), inventory_size)
+        self._word_offsets = self._section(WORD_OFFSETS, 'I')
+        self._word_blob = self._section(WORD_BLOB)
+        self._phone_offsets = self._section(PHONE_OFFSETS, 'I')
+        self._phone_blob = self._section(PHONE_BLOB, 'H')
+        self.has_syllables = self._sections[SYLL_OFFSETS][1] > 0
+        self.has_stress = self._sections[STRESS_BLOB][1] > 0
+        self.has_pos = self._sections[POS_INDEX][1] > 0
+        if self.has_syllables:
+            self._syll_offsets = self._section(SYLL_OFFSETS, 'I')
+            self._syll_blob = self._section(SYLL_BLOB, 'H')
+            self._stress_blob = self._section(STRESS_BLOB)
+        if self.has_pos:
+            self._pos_index = self._section(POS_INDEX)
+            self._pos_table = bytes(self._section(POS_TABLE)).decode('utf-8').split('\n')
+
+    def _section(self, section_id, typecode=None):
+        offset, length = self._sections[section_id]
+        view = self._view[offset: offset + length]
+        if typecode:
+            view = view.cast(typecode)
+        return view
+
+    def close(self):
+        """
+        Unmap the file. Views returned by phone_ids() have to be released before closing.
+        """
+        for attr in ('_word_offsets', '_word_blob', '_phone_offsets', '_phone_blob',
+                     '_syll_offsets', '_syll_blob', '_stress_blob', '_pos_index'):
+            view = self.__dict__.pop(attr, None)
+            if view is not None:
+                view.release()
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, word):
+        lo, hi = self.find(word)
+        return hi > lo
+
+    def _word_bytes(self, index):
+        return bytes(self._word_blob[self._word_offsets[index]: self._word_offsets[index + 1]])
+
+    def _bisect_left(self, key):
+        lo = 0
+        hi = self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._word_bytes(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def word(self, index):
+        return self._word_bytes(index).decode('utf-8')
+
+    def phone_ids(self, index):
+        """
+        :return: a zero-copy view of the phone IDs of entry index
+        """
+        return self._phone_blob[self._phone_offsets[index]: self._phone_offsets[index + 1]]
+
+    def transcript(self, index):
+        return self.inventory.decode(self.phone_ids(index))
+
+    def syllables(self, index):
+        """
+        :return: the syllable start indices of entry index, an empty list if the lexicon has no syllable column
+        """
+        if not self.has_syllables:
+            return []
+        return list(self._syll_blob[self._syll_offsets[index]: self._syll_offsets[index + 1]])
+
+    def stress(self, index):
+        if not self.has_stress:
+            return []
+        return list(self._stress_blob[self._syll_offsets[index]: self._syll_offsets[index + 1]])
+
+    def pos(self, index):
+        if not self.has_pos:
+            return 'nil'
+        return self._pos_table[self._pos_index[index]]
+
+    def find(self, word):
+        """
+        :return: the index range (start, end) of the entries of word, start == end if word is not in the lexicon
+        """
+        key = word.encode('utf-8')
+        lo = self._bisect_left(key)
+        hi = lo
+        while hi < self.size and self._word_bytes(hi) == key:
+            hi += 1
+        return lo, hi
+
+    def lookup(self, word):
+        """
+        :return: a list of all transcripts of word, empty if word is not in the lexicon
+        """
+        lo, hi = self.find(word)
+        return [self.transcript(i) for i in range(lo, hi)]
+
+    def iter_prefix(self, prefix):
+        """
+        Iterate over all entries starting with prefix, in sorted order.
+        :return: generator of (word, transcript) tuples
+        """
+        key = prefix.encode('utf-8')
+        ind = self._bisect_left(key)
+        while ind < self.size:
+            word_bytes = self._word_bytes(ind)
+            if not word_bytes.startswith(key):
+                break
+            yield word_bytes.decode('utf-8'), self.transcript(ind)
+            ind += 1
+
+    def entries(self):
+        for ind in range(self.size):
+            yield self.word(ind), self.transcript(ind)
+
+    def to_lexicon(self):
+        """
+        :return: an in-memory Lexicon containing all entries, sharing the phone inventory of this file
+        """
+        lexicon = Lexicon(self.inventory)
+        for ind in range(self.size):
+            lexicon.append(self.word(ind), array('H', self.phone_ids(ind)))
+        return lexicon
+
+
+def main():
+    write_dictionary_file(sys.argv[1], sys.argv[2])
+
+
+if __name__ == '__main__':
+    main()
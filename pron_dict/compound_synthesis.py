@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pronunciation synthesis for compounds not in the pronunciation dictionary.
+
+An unknown word is divided into modifier and head like in tree_builder.build_compound_tree() (see
+tree_builder.split_compound()). Components whose transcript is not known are divided further. Transcripts are
+looked up first in the dictionary and then in an optional second mapping, e.g. the compound database. The
+transcripts of the components are joined, and each boundary is adjusted. Below, each rule is shown with how often
+the compound transcript differs from the joined component transcripts in the way the rule predicts. The counts
+are from the compounds of data/08_final_version/IPD_IPA_clean.csv whose modifier and head are both in the
+dictionary:
+
+    - vowels of non-initial components are short, the main stress is on the first component     1728 / 2263
+    - the last vowel of a component is short, if it is followed by a consonant in the component
+      and the next component starts with a consonant                                            1227 / 1626
+    - the initial stop of a non-initial component is not aspirated                              478 / 557
+    - a voiceless sonorant ending a component is voiced before a vowel ('a p l̥' + 'a n')         108 / 108
+
+Voicing of r, l, n, m before the initial stop of a head is not consistent in the data (51 devoiced, about 220
+unchanged), so no rule is applied for it.
+
+The confidence of a synthesised transcript is the product of BOUNDARY_CONFIDENCE for each boundary and
+MAPPED_CONFIDENCE for each component not found in the dictionary. BOUNDARY_CONFIDENCE is the share of correct
+transcripts among the two-component compounds of IPD_IPA_clean.csv, synthesised from the other entries
+(for three components 0.44, close to 0.69 ** 2). Joining the component transcripts without adjustments is
+correct for 0.45 of the compounds, the adjustments raise it to 0.68.
+
+Both IPA and X-SAMPA transcripts can be joined, the phones are classified by pron_dict.lexicon.phone_features().
+
+Usage:
+
+    synthesiser = CompoundSynthesiser(lexicon_lookup)
+    synthesiser.synthesise('hestasteinn')       # ('h ɛ s t a s t ei t n̥', 0.69)
+
+    python3 -m pron_dict.compound_synthesis data/08_final_version/IPD_IPA_clean.csv words.txt
+
+"""
+
+import sys
+
+from pron_dict import tree_builder
+from pron_dict.lexicon import Lexicon, phone_features, VOWEL, LONG, VOICELESS, ASPIRATED
+from pron_dict.lexicon import IPA_LENGTH_SYMBOL, XSAMPA_LENGTH_SYMBOL, IPA_ASPIRATION_SYMBOL, \
+    XSAMPA_ASPIRATION_SYMBOL, IPA_VOICELESS_SYMBOLS, XSAMPA_VOICELESS_SYMBOL
+
+BOUNDARY_CONFIDENCE = 0.69
+MAPPED_CONFIDENCE = 0.8
+
+# phone -> feature bitmask, see features()
+FEATURES = {}
+
+
+def features(phone):
+    mask = FEATURES.get(phone)
+    if mask is None:
+        mask = phone_features(phone)
+        FEATURES[phone] = mask
+    return mask
+
+
+def shorten(phone):
+    """
+    'aː' -> 'a', 'a:' -> 'a'
+    """
+    if phone.endswith(IPA_LENGTH_SYMBOL) or phone.endswith(XSAMPA_LENGTH_SYMBOL):
+        return phone[:-1]
+    return phone
+
+
+def deaspirate(phone):
+    """
+    'kʰ' -> 'k', 'k_h' -> 'k'
+    """
+    return phone.replace(IPA_ASPIRATION_SYMBOL, '').replace(XSAMPA_ASPIRATION_SYMBOL, '')
+
+
+def voice(phone):
+    """
+    'l̥' -> 'l', 'l_0' -> 'l'
+    """
+    phone = phone.replace(XSAMPA_VOICELESS_SYMBOL, '')
+    for diacritic in IPA_VOICELESS_SYMBOLS:
+        phone = phone.replace(diacritic, '')
+    return phone
+
+
+def join_components(transcripts):
+    """
+    Join the transcripts of compound components, adjusting each boundary (see the module docstring).
+    :param transcripts: a list of phone lists, one for each component from left to right
+    :return: the list of phones of the compound
+    """
+    result = list(transcripts[0])
+    start = 0   # start of the last component in result
+    for phones in transcripts[1:]:
+        phones = [shorten(p) if features(p) & LONG else p for p in phones]
+        first = features(phones[0])
+        last = features(result[-1])
+        if not first & VOWEL and not last & VOWEL:
+            for ind in range(len(result) - 1, start - 1, -1):
+                if features(result[ind]) & VOWEL:
+                    result[ind] = shorten(result[ind])
+                    break
+        if first & ASPIRATED:
+            phones[0] = deaspirate(phones[0])
+        if first & VOWEL and last & VOICELESS and not last & VOWEL:
+            result[-1] = voice(result[-1])
+        start = len(result)
+        result.extend(phones)
+    return result
+
+
+class CompoundSynthesiser:
+
+    def __init__(self, lookup, mapped_lookup=None, boundary_confidence=BOUNDARY_CONFIDENCE,
+                 mapped_confidence=MAPPED_CONFIDENCE):
+        """
+        :param lookup: a function word -> transcript, None if word is not in the dictionary
+        :param mapped_lookup: an optional function word -> transcript for components not in the dictionary
+        :param boundary_confidence: confidence factor for each boundary between components
+        :param mapped_confidence: confidence factor for each component found by mapped_lookup
+        """
+        self.lookup = lookup
+        self.mapped_lookup = mapped_lookup
+        self.boundary_confidence = boundary_confidence
+        self.mapped_confidence = mapped_confidence
+
+    def component(self, word):
+        """
+        :return: (transcript, confidence) of a compound component, None if its transcript is not known
+        """
+        transcr = self.lookup(word)
+        if transcr:
+            return transcr, 1.0
+        if self.mapped_lookup is not None:
+            transcr = self.mapped_lookup(word)
+            if transcr:
+                return transcr, self.mapped_confidence
+        return None
+
+    def divide(self, word):
+        """
+        Divide word into components with known transcripts. Components are only divided further if their
+        transcript is not known, word itself is always divided.
+        :return: a list of (component, transcript, confidence) from left to right, None if word can not be
+        divided into known components
+        """
+        leaves = []
+        stack = [(word, True)]
+        while stack:
+            comp, is_word = stack.pop()
+            if not is_word:
+                found = self.component(comp)
+                if found is not None:
+                    leaves.append((comp,) + found)
+                    continue
+            mod, head = tree_builder.split_compound(comp)
+            if len(mod) == 0 or len(head) == 0:
+                return None
+            stack.append((head, False))
+            stack.append((mod, False))
+        return leaves
+
+    def synthesise(self, word):
+        """
+        :return: (transcript, confidence) of word, None if word can not be divided into known components
+        """
+        leaves = self.divide(word)
+        if not leaves:
+            return None
+        confidence = self.boundary_confidence ** (len(leaves) - 1)
+        for comp, transcr, comp_confidence in leaves:
+            confidence *= comp_confidence
+        return ' '.join(join_components([transcr.split() for comp, transcr, comp_confidence in leaves])), confidence
+
+
+def main():
+    lexicon = Lexicon.from_file(sys.argv[1])
+    index = {}
+    for ind, word in enumerate(lexicon.words):
+        index.setdefault(word, ind)
+
+    def lookup(word):
+        return lexicon.transcript(index[word]) if word in index else None
+
+    synthesiser = CompoundSynthesiser(lookup)
+    with open(sys.argv[2]) as f:
+        for line in f:
+            word = line.split('\t')[0].strip()
+            if not word:
+                continue
+            result = synthesiser.synthesise(word)
+            if result is None:
+                print('no decomposition of "' + word + '"', file=sys.stderr)
+            else:
+                print(word + '\t' + result[0] + '\t' + '{:.2f}'.format(result[1]))
+
+
+if __name__ == '__main__':
+    main()
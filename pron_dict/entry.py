@@ -8,8 +8,15 @@ class PronDictEntry:
     Contains information on a pronunciation dict entry and methods to manipulate it
 
     The initialisation of a PronDictEntry object takes a word string and its transcription as parameters.
+
+    Most processing steps only need word and transcript, so the optional collections (transcript variants,
+    syllables, compound elements, entailing compounds) are only created when first accessed, and the
+    transcript is only split into phones on request.
     """
 
+    __slots__ = ('word', 'transcript', 'gpos', 'frequency',
+                 '_transcript_variants', '_syllables', '_compound_elements', '_entailing_compounds')
+
     def __init__(self, word='', transcription=''):
         """
 
@@ -19,14 +26,59 @@ class PronDictEntry:
         """
         self.word = word
         self.transcript = transcription.strip()
-        self.transcription_arr = self.transcript.split()
-        self.transcript_variants = set()
-        self.transcript_variants.add(self.transcript)
         self.gpos = 'nil'  # guessed part-of-speech
-        self.syllables = []
-        self.compound_elements = []
-        self.entailing_compounds = [] # compounds where this word is one part
         self.frequency = 0
+        self._transcript_variants = None
+        self._syllables = None
+        self._compound_elements = None
+        self._entailing_compounds = None  # compounds where this word is one part
+
+    @property
+    def transcription_arr(self):
+        """
+        the phones of the transcript as a list
+        """
+        return self.transcript.split()
+
+    @property
+    def transcript_variants(self):
+        if self._transcript_variants is None:
+            self._transcript_variants = {self.transcript}
+        return self._transcript_variants
+
+    @transcript_variants.setter
+    def transcript_variants(self, variants):
+        self._transcript_variants = variants
+
+    @property
+    def syllables(self):
+        if self._syllables is None:
+            self._syllables = []
+        return self._syllables
+
+    @syllables.setter
+    def syllables(self, syllables):
+        self._syllables = syllables
+
+    @property
+    def compound_elements(self):
+        if self._compound_elements is None:
+            self._compound_elements = []
+        return self._compound_elements
+
+    @compound_elements.setter
+    def compound_elements(self, elements):
+        self._compound_elements = elements
+
+    @property
+    def entailing_compounds(self):
+        if self._entailing_compounds is None:
+            self._entailing_compounds = []
+        return self._entailing_compounds
+
+    @entailing_compounds.setter
+    def entailing_compounds(self, compounds):
+        self._entailing_compounds = compounds
 
     def __str__(self):
         return self.word + '\t' + self.gpos + '\t' + self.transcript + '\t' + str(self.syllables)
@@ -55,38 +107,25 @@ class PronDictEntry:
         self.syllables[ind] = syll
 
     def cmu_format_syllables(self):
-        formatted_string = '('
-        for syll in self.syllables:
-            formatted_string += '((' + syll.content + ') ' + str(syll.stress) + ') '
-
-        return formatted_string.strip() + ')'
+        return '(' + ' '.join(['((' + syll.content + ') ' + str(syll.stress) + ')' for syll in self.syllables]) + ')'
 
     def cmu_format(self):
         return '("' + self.word + '" ' + self.gpos + ' ' + self.cmu_format_syllables() + ')'
 
     def dot_format_syllables(self):
-        sylls = ''
-        for syll in self.syllables:
-            sylls += syll.content.strip() + '.'
-        sylls = sylls[0:-1]
-        return sylls
+        return '.'.join([' '.join(syll.phones) for syll in self.syllables])
 
     def syllable_format(self):
         return self.word + ' - ' + self.dot_format_syllables()
 
     def stress_format(self):
-        sylls = ''
+        stressed_phones = []
         for syll in self.syllables:
-            stressed_phones = []
-            phones = syll.content.strip().split()
-            for p in phones:
-                if p in VOWELS:
-                    p = p + str(syll.stress)
-                stressed_phones.append(p)
-
-            sylls += ' '.join(stressed_phones) + ' '
+            stress = str(syll.stress)
+            for p in syll.phones:
+                stressed_phones.append(p + stress if p in VOWELS else p)
 
-        return sylls.strip()
+        return ' '.join(stressed_phones)
 
     def simple_stress_format(self):
-        return self.stress_format()
\ No newline at end of file
+        return self.stress_format()
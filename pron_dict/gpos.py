@@ -16,7 +16,7 @@ Collects statistics about the three categories.
 
 import sys
 import sqlite3
-import entry
+from pron_dict import entry
 
 #statistics
 NONE = 0
@@ -119,22 +119,27 @@ def perform_gpos_for_dict(dictionary):
     return gpos_dict
 
 
-def perform_gpos_for_entry_list(entry_list):
+def perform_gpos_for_entry_list(entry_list, conn=None):
     """
     Guess the part-of-speech for each PronDictEntry in entry_list, add POS-info
     to each entry ('nil' if nothing found)
     :param entry_list: list of PronDictEntries for which to guess POS
+    :param conn: an open connection to the BÍN database, if None a connection to DATABASE is opened and closed
+    again after processing entry_list
 
     """
 
-    conn = create_connection(DATABASE)
+    own_conn = conn is None
+    if own_conn:
+        conn = create_connection(DATABASE)
     statistics = {NONE: 0, SINGLE: 0, MULTI: 0}
     for dict_entry in entry_list:
         pos_list = get_entries_from_BIN(dict_entry.word, conn)
         collect_pos_statistics(statistics, pos_list)
         dict_entry.gpos = get_priority_pos(pos_list)
 
-    conn.close()
+    if own_conn:
+        conn.close()
     #print_statistics(statistics)
 
 
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Array-backed representation of a pronunciation dictionary.
+
+A dictionary file ('word\tt r a n s c r i p t') is parsed once: each phone symbol is interned into
+a PhoneInventory and the transcripts are stored as phone IDs in one flat array('H'), with an offset
+array marking where each entry starts. Per-entry views are memoryview slices of the phone array, so
+processors can work on integer arrays without re-splitting transcript strings.
+
+Each phone in the inventory has a feature bitmask (VOWEL, LONG, VOICELESS, ASPIRATED), derived from the
+symbol itself. Both IPA and X-SAMPA symbols are recognised:
+
+    aː / a:     VOWEL | LONG
+    n̥ / n_0     VOICELESS
+    kʰ / k_h    ASPIRATED
+
+Note that memoryviews of the phone array have to be released before new entries are appended to the lexicon.
+
+"""
+
+import sys
+from array import array
+
+# feature bits
+VOWEL = 1
+LONG = 2
+VOICELESS = 4
+ASPIRATED = 8
+
+IPA_LENGTH_SYMBOL = 'ː'
+XSAMPA_LENGTH_SYMBOL = ':'
+IPA_VOICELESS_SYMBOLS = ('̥', '̊')  # 'n̥', 'ŋ̊'
+XSAMPA_VOICELESS_SYMBOL = '_0'
+IPA_ASPIRATION_SYMBOL = 'ʰ'
+XSAMPA_ASPIRATION_SYMBOL = '_h'
+
+# vowels without length mark, the long versions are recognised through the LONG feature
+IPA_VOWELS = frozenset(['a', 'ai', 'au', 'ei', 'i', 'ou', 'u', 'œ', 'œy', 'ɔ', 'ɔi', 'ɛ', 'ɪ', 'ʏ', 'ʏi'])
+XSAMPA_VOWELS = frozenset(['a', 'ai', 'au', 'ei', 'i', 'ou', 'Ou', 'u', '9', '9Y', 'O', 'Oi', 'E', 'I', 'Y', 'Yi'])
+VOWEL_SYMBOLS = IPA_VOWELS | XSAMPA_VOWELS
+
+# phone IDs are stored as unsigned shorts
+MAX_PHONES = 0xFFFF
+
+
+def base_symbol(phone):
+    """
+    Strip length, voicelessness and aspiration marks from phone: 'aː' -> 'a', 'n_0' -> 'n', 'kʰ' -> 'k'
+    """
+    phone = phone.replace(IPA_LENGTH_SYMBOL, '').replace(XSAMPA_LENGTH_SYMBOL, '')
+    phone = phone.replace(XSAMPA_VOICELESS_SYMBOL, '').replace(XSAMPA_ASPIRATION_SYMBOL, '')
+    phone = phone.replace(IPA_ASPIRATION_SYMBOL, '')
+    for diacritic in IPA_VOICELESS_SYMBOLS:
+        phone = phone.replace(diacritic, '')
+    return phone
+
+
+def phone_features(phone):
+    """
+    :param phone: an IPA or X-SAMPA phone symbol
+    :return: the feature bitmask of phone
+    """
+    mask = 0
+    if phone.endswith(IPA_LENGTH_SYMBOL) or phone.endswith(XSAMPA_LENGTH_SYMBOL):
+        mask |= LONG
+    if phone.endswith(XSAMPA_VOICELESS_SYMBOL) or any(d in phone for d in IPA_VOICELESS_SYMBOLS):
+        mask |= VOICELESS
+    if phone.endswith(XSAMPA_ASPIRATION_SYMBOL) or IPA_ASPIRATION_SYMBOL in phone:
+        mask |= ASPIRATED
+    if base_symbol(phone) in VOWEL_SYMBOLS:
+        mask |= VOWEL
+    return mask
+
+
+class PhoneInventory:
+    """
+    Maps phone symbols to integer IDs and back. The feature bitmask of a phone is stored at the index of its ID
+    in self.features, such that 'inventory.features[phone_id] & VOWEL' is a simple array lookup.
+    """
+
+    def __init__(self, symbols=()):
+        self.symbols = []
+        self.ids = {}
+        self.features = array('B')
+        for sym in symbols:
+            self.intern(sym)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, phone):
+        return phone in self.ids
+
+    def intern(self, phone):
+        """
+        :param phone: a phone symbol
+        :return: the ID of phone, a new ID is created if phone is not yet in the inventory
+        """
+        phone_id = self.ids.get(phone)
+        if phone_id is None:
+            phone_id = len(self.symbols)
+            if phone_id >= MAX_PHONES:
+                raise ValueError('Phone inventory is full, can not add ' + phone)
+            self.ids[phone] = phone_id
+            self.symbols.append(phone)
+            self.features.append(phone_features(phone))
+        return phone_id
+
+    def symbol(self, phone_id):
+        return self.symbols[phone_id]
+
+    def feature_mask(self, feature):
+        """
+        :param feature: a feature bit or a combination of bits, e.g. VOWEL or VOWEL | LONG
+        :return: a bytearray indexed by phone ID, 1 if the phone has all bits of feature, 0 otherwise
+        """
+        return bytearray(1 if f & feature == feature else 0 for f in self.features)
+
+    def encode(self, transcript):
+        """
+        :param transcript: space separated phones, or a list of phones
+        :return: an array('H') of phone IDs
+        """
+        if isinstance(transcript, str):
+            transcript = transcript.split()
+        return array('H', [self.intern(p) for p in transcript])
+
+    def decode(self, phone_ids):
+        """
+        :param phone_ids: a sequence of phone IDs
+        :return: the space separated transcript
+        """
+        symbols = self.symbols
+        return ' '.join([symbols[i] for i in phone_ids])
+
+
+class Lexicon:
+    """
+    A pronunciation dictionary stored as a word list and a flat phone ID array.
+
+    The transcript of entry i is self.phones[self.offsets[i]:self.offsets[i + 1]]. Words are kept in input order,
+    the same word can occur more than once (multiple transcripts).
+    """
+
+    def __init__(self, inventory=None):
+        self.inventory = inventory if inventory is not None else PhoneInventory()
+        self.words = []
+        self.phones = array('H')
+        self.offsets = array('L', [0])
+
+    @classmethod
+    def from_lines(cls, lines, inventory=None):
+        """
+        Parse dictionary lines of the format 'word\tt r a n s c r i p t'. Further columns are ignored.
+
+        :param lines: an iterable of dictionary lines, e.g. an open file
+        :param inventory: a PhoneInventory to share with other lexica, a new one is created if None
+        :return: a new Lexicon
+        """
+        lexicon = cls(inventory)
+        for line in lines:
+            line = line.rstrip('\n')
+            if not line.strip():
+                continue
+            cols = line.split('\t')
+            lexicon.append(cols[0], cols[1] if len(cols) > 1 else '')
+        return lexicon
+
+    @classmethod
+    def from_file(cls, filename, inventory=None):
+        with open(filename) as f:
+            return cls.from_lines(f, inventory)
+
+    def __len__(self):
+        return len(self.words)
+
+    def __iter__(self):
+        for i in range(len(self.words)):
+            yield self.words[i], self.phone_ids(i)
+
+    def append(self, word, transcript):
+        """
+        Add an entry at the end of the lexicon.
+        :param word: the word string
+        :param transcript: space separated phones, a list of phones or an array of phone IDs from self.inventory
+        """
+        if isinstance(transcript, array):
+            self.phones.extend(transcript)
+        else:
+            intern = self.inventory.intern
+            if isinstance(transcript, str):
+                transcript = transcript.split()
+            self.phones.extend([intern(p) for p in transcript])
+        self.words.append(word)
+        self.offsets.append(len(self.phones))
+
+    def span(self, index):
+        """
+        :return: start and end offset of the transcript of entry index in self.phones
+        """
+        return self.offsets[index], self.offsets[index + 1]
+
+    def phone_ids(self, index):
+        """
+        :return: a zero-copy view of the phone IDs of entry index
+        """
+        start, end = self.span(index)
+        return memoryview(self.phones)[start:end]
+
+    def phone_count(self, index):
+        return self.offsets[index + 1] - self.offsets[index]
+
+    def features(self, index):
+        """
+        :return: a list of feature bitmasks, one for each phone of entry index
+        """
+        features = self.inventory.features
+        start, end = self.span(index)
+        return [features[p] for p in self.phones[start:end]]
+
+    def transcript(self, index):
+        start, end = self.span(index)
+        return self.inventory.decode(self.phones[start:end])
+
+    def phone_list(self, index):
+        symbols = self.inventory.symbols
+        start, end = self.span(index)
+        return [symbols[p] for p in self.phones[start:end]]
+
+    def line(self, index):
+        return self.words[index] + '\t' + self.transcript(index)
+
+    def lines(self):
+        for i in range(len(self.words)):
+            yield self.line(i)
+
+
+def main():
+    lexicon = Lexicon.from_file(sys.argv[1])
+    print('Entries: ' + str(len(lexicon)))
+    print('Phones: ' + str(len(lexicon.phones)))
+    print('Phone inventory: ' + str(len(lexicon.inventory)))
+    for phone_id, phone in enumerate(lexicon.inventory.symbols):
+        print(phone + '\t' + str(lexicon.inventory.features[phone_id]))
+
+
+if __name__ == '__main__':
+    main()
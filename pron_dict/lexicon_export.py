@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Bulk export of syllabified PronDictEntries to lexicon files for TTS.
+
+Formats:
+
+    cmu     Festival/CMU lexicon:   ("hestur" n (((h E s ) 1) ((t Y r ) 0)))
+    dot     dotted syllables:       hestur - h E s.t Y r
+    stress  stress marked vowels:   hestur\th E1 s t Y0 r
+
+The lines are generated one entry at a time and written with writelines(), such that a collection of entries can
+be written to one or several formats in a single pass, without building the whole output in memory.
+
+"""
+
+import io
+
+FORMATS = ('cmu', 'dot', 'stress')
+
+
+def cmu_line(dict_entry):
+    return dict_entry.cmu_format() + '\n'
+
+
+def dot_line(dict_entry):
+    return dict_entry.syllable_format() + '\n'
+
+
+def stress_line(dict_entry):
+    return dict_entry.word + '\t' + dict_entry.stress_format() + '\n'
+
+
+LINE_FORMATTERS = {'cmu': cmu_line, 'dot': dot_line, 'stress': stress_line}
+
+
+def export_lines(entries, fmt='cmu'):
+    """
+    :param entries: an iterable of syllabified PronDictEntries, e.g. a LexiconStore
+    :param fmt: one of FORMATS
+    :return: a generator of newline terminated lines in the format fmt
+    """
+    if fmt not in LINE_FORMATTERS:
+        raise ValueError('Unknown export format: ' + fmt + ', valid formats: ' + ', '.join(FORMATS))
+    return map(LINE_FORMATTERS[fmt], entries)
+
+
+def export_string(entries, fmt='cmu'):
+    """
+    :return: the whole export of entries in format fmt as one string
+    """
+    out = io.StringIO()
+    out.writelines(export_lines(entries, fmt))
+    return out.getvalue()
+
+
+def write_lexicon(entries, filename, fmt='cmu'):
+    with open(filename, 'w') as f:
+        f.writelines(export_lines(entries, fmt))
+
+
+def write_lexicon_formats(entries, filenames):
+    """
+    Write entries to several formats in one pass over entries, e.g. if entries is a generator.
+    :param entries: an iterable of syllabified PronDictEntries
+    :param filenames: a dict format -> output file name
+    """
+    for fmt in filenames:
+        if fmt not in LINE_FORMATTERS:
+            raise ValueError('Unknown export format: ' + fmt + ', valid formats: ' + ', '.join(FORMATS))
+    outputs = [(LINE_FORMATTERS[fmt], open(filename, 'w')) for fmt, filename in filenames.items()]
+    try:
+        for dict_entry in entries:
+            for formatter, f in outputs:
+                f.write(formatter(dict_entry))
+    finally:
+        for formatter, f in outputs:
+            f.close()
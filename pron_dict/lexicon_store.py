@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Incrementally updatable pronunciation dictionary.
+
+A LexiconStore keeps the entries of a dictionary (X-SAMPA transcripts) together with their compound trees,
+syllables, part-of-speech and stress. Instead of rerunning tree_builder, syllabification, gpos and stress on the
+whole dictionary after each change, add_entries() and remove_entries() only recompute the entries affected by
+the change:
+
+    - the entries of the added/removed words themselves
+    - compounds having one of the words as a head: the transcript of a compound head is looked up in the
+      dictionary (see tree_builder.extract_transcription()), so the compound division might change
+    - words starting with one of the words (or with a recomputed compound), since their stress is
+      synchronized with the stress of the prefix word (see stress.StressTrie)
+
+Usage:
+
+    store = LexiconStore.from_file('data/train_test_dev_sets/frob_train.txt')
+    store.add_entries([('hestamaður', 'h E s t a m a D Y r')])
+    store.remove_entries(['hestamaður'])
+    for line in store.stress_lines():
+        ...
+
+"""
+
+import sys
+from collections import ChainMap
+
+from pron_dict import entry
+from pron_dict import gpos
+from pron_dict import tree_builder
+from pron_dict.stress import StressTrie
+from pron_dict.syllabification import syllabify_tree, LEAF_CACHE
+
+
+class LexiconStore:
+
+    def __init__(self, transcr_map=None, gpos_conn=None, cache=LEAF_CACHE):
+        """
+        :param transcr_map: optional mapping word -> transcript used for compound heads not in the store,
+        e.g. tree_builder.TRANSCR_MAP. Words in the store always have precedence.
+        :param gpos_conn: optional open connection to the BÍN database (see gpos.create_connection()),
+        if None, the part-of-speech of all entries is 'nil'
+        :param cache: a LeafSyllableCache for the compound tree leaves, None to syllabify every leaf from scratch
+        """
+        self.entries = {}       # word -> list of PronDictEntries, in the order they were added
+        self.trees = {}         # word -> list of CompoundTrees, one for each entry of the word
+        self.transcripts = {}   # word -> transcript used when the word is a compound head
+        self.heads = {}         # word -> set of compound heads looked up when analysing the word
+        self.compounds = {}     # compound head -> set of words having looked up the head
+        self.transcr_map = ChainMap(self.transcripts, transcr_map if transcr_map is not None else {})
+        self.gpos_conn = gpos_conn
+        self.cache = cache
+        self.trie = StressTrie()
+
+    @classmethod
+    def from_lines(cls, lines, **kwargs):
+        """
+        :param lines: dictionary lines of the format 'word\tt r a n s c r i p t'
+        :param kwargs: see __init__()
+        :return: a new LexiconStore containing the entries of lines
+        """
+        store = cls(**kwargs)
+        store.add_entries(line.rstrip('\n').split('\t')[:2] for line in lines if line.strip())
+        return store
+
+    @classmethod
+    def from_file(cls, filename, **kwargs):
+        with open(filename) as f:
+            return cls.from_lines(f, **kwargs)
+
+    def __len__(self):
+        return sum(len(entries) for entries in self.entries.values())
+
+    def __contains__(self, word):
+        return word in self.entries
+
+    def __iter__(self):
+        for entries in self.entries.values():
+            for dict_entry in entries:
+                yield dict_entry
+
+    def lookup(self, word):
+        """
+        :return: the list of PronDictEntries of word, empty if word is not in the store
+        """
+        return self.entries.get(word, [])
+
+    def add_entries(self, new_entries):
+        """
+        Add new entries and recompute all entries affected by them.
+        :param new_entries: an iterable of (word, transcript) pairs. A word already in the store gets an
+        additional transcript.
+        :return: the list of PronDictEntries whose compound tree, syllables or stress were recomputed
+        """
+        added = []
+        words = []
+        for word, transcr in new_entries:
+            dict_entry = entry.PronDictEntry(word, transcr)
+            if word not in self.entries:
+                self.entries[word] = []
+                words.append(word)
+            self.entries[word].append(dict_entry)
+            self.transcripts[word] = dict_entry.transcript
+            added.append(dict_entry)
+
+        if self.gpos_conn is not None:
+            gpos.perform_gpos_for_entry_list(added, self.gpos_conn)
+
+        changed = set(words)
+        for dict_entry in added:
+            changed.add(dict_entry.word)
+            self.trie.add(dict_entry)
+        return self._update(changed)
+
+    def remove_entries(self, words):
+        """
+        Remove all entries of words and recompute all entries affected by the removal.
+        :param words: an iterable of words, words not in the store are ignored
+        :return: the list of PronDictEntries whose compound tree, syllables or stress were recomputed
+        """
+        changed = set()
+        for word in words:
+            if word not in self.entries:
+                continue
+            for dict_entry in self.entries.pop(word):
+                self.trie.remove(dict_entry)
+            del self.trees[word]
+            del self.transcripts[word]
+            self._forget(word)
+            changed.add(word)
+        return self._update(changed)
+
+    def _forget(self, word):
+        for head in self.heads.pop(word, ()):
+            compounds = self.compounds[head]
+            compounds.discard(word)
+            if not compounds:
+                del self.compounds[head]
+
+    def _analyse(self, word):
+        """
+        Build the compound trees of all entries of word and syllabify them, record the compound heads looked up.
+        """
+        self._forget(word)
+        trees = []
+        heads = set()
+        for dict_entry in self.entries[word]:
+            tree = tree_builder.build_compound_tree(dict_entry, self.transcr_map)
+            syllables = []
+            syllabify_tree(tree, syllables, self.cache)
+            dict_entry.syllables = syllables
+            trees.append(tree)
+            self._collect_heads(tree, heads)
+        self.trees[word] = trees
+        self.heads[word] = heads
+        for head in heads:
+            self.compounds.setdefault(head, set()).add(word)
+
+    @staticmethod
+    def _collect_heads(tree, heads):
+        nodes = [tree]
+        while nodes:
+            node = nodes.pop()
+            mod, head = tree_builder.split_compound(node.elem.word)
+            if len(mod) > 0 and len(head) > 0:
+                heads.add(head)
+            if node.left:
+                nodes.append(node.left)
+            if node.right:
+                nodes.append(node.right)
+
+    def _update(self, changed):
+        """
+        :param changed: words added to or removed from the store
+        :return: the list of recomputed PronDictEntries
+        """
+        reanalyse = set()
+        for word in changed:
+            if word in self.entries:
+                reanalyse.add(word)
+            reanalyse.update(self.compounds.get(word, ()))
+        for word in reanalyse:
+            self._analyse(word)
+
+        # every word starting with a changed or reanalysed word needs new stress, shorter words first
+        # such that the stress of a prefix is always set before it is used
+        restress = {}
+        for word in changed | reanalyse:
+            for dict_entry in self.trie.extensions(word):
+                restress[id(dict_entry)] = dict_entry
+        affected = sorted(restress.values(), key=lambda x: len(x.word))
+        for dict_entry in affected:
+            self.trie.set_entry_stress(dict_entry)
+        return affected
+
+    def cmu_lines(self):
+        for dict_entry in self:
+            yield dict_entry.cmu_format()
+
+    def stress_lines(self):
+        for dict_entry in self:
+            yield dict_entry.word + '\t' + dict_entry.stress_format()
+
+
+def main():
+    store = LexiconStore.from_file(sys.argv[1])
+    for line in store.cmu_lines():
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
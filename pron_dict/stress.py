@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import entry
 
 # max number of syllables for a word only having primary stress on first syllable, other syllables without stress
 ONE_STRESS_SYLL_COUNT = 4
@@ -10,11 +9,11 @@ PRIMARY_STRESS = 1
 NO_STRESS = 3
 
 # grammatical and other endings containing a vowel and thus constituting a syllable of their own
-ENDING_SYLLABLES = ['a', 'i', 'u', 'ar', 'ir', 'ur', 'is', 'um', 'na', 'ni', 'nu', 'ið', 'ins', 'sins', 'in', 'inn',
+ENDING_SYLLABLES = frozenset(['a', 'i', 'u', 'ar', 'ir', 'ur', 'is', 'um', 'na', 'ni', 'nu', 'ið', 'ins', 'sins', 'in', 'inn',
                     'unum', 'num', 'nna', 'nni', 'nnar', 'innar', 'nar', 'inum', 'nir', 'irnir', 'ina', 'va', 'var', 'vum',
                     'ngur', 'inu', 'stu', 'ra', 'ndi', 'da', 'di', 'un', 'uð', 'ri', 'gur', 'ga', 'gðar', 'gðir', 'gður',
                     'nga', 'leg', 'lega', 'nlegt', 'legt', 'semi', 'ning', 'arinnar', 'ði', 'tha', 'ðar', 'ðir', 'sti',
-                    'nda', 'ba', 'ngu', 'inni', 'ður', 'ngum', 'ann', 'anna', 'anni', 'ara', 'ari', 'as', 'að', 'enn', 'í', 'ía']
+                    'nda', 'ba', 'ngu', 'inni', 'ður', 'ngum', 'ann', 'anna', 'anni', 'ara', 'ari', 'as', 'að', 'enn', 'í', 'ía'])
 
 
 def last_stress(pron_dict_entry):
@@ -78,6 +77,120 @@ def should_add_primary_stress(current_word, modifier):
     return False
 
 
+# key of the entry list in a trie node, all other keys of a node are characters
+ENTRIES = None
+
+
+class StressTrie:
+    """
+    A character trie of syllabified words, used to find the longest word in the dictionary that the
+    word of an entry starts with (the possible compound modifier, or the word without its ending) in O(len(word)).
+    Each node is a dict mapping characters to child nodes, the entries of the word ending at a node
+    are stored under the key ENTRIES.
+
+    Since the trie does not depend on the order of the entries, stress can be set for unsorted input, and a new
+    entry only requires stress to be set for itself and the words starting with it (see insert()).
+    """
+
+    def __init__(self, entries=()):
+        self.root = {}
+        for dict_entry in entries:
+            self.add(dict_entry)
+
+    def _node(self, word):
+        node = self.root
+        for c in word:
+            node = node.get(c)
+            if node is None:
+                return None
+        return node
+
+    def add(self, dict_entry):
+        node = self.root
+        for c in dict_entry.word:
+            node = node.setdefault(c, {})
+        node.setdefault(ENTRIES, []).append(dict_entry)
+
+    def remove(self, dict_entry):
+        node = self._node(dict_entry.word)
+        if node is not None and dict_entry in node.get(ENTRIES, []):
+            node[ENTRIES].remove(dict_entry)
+
+    def longest_prefix(self, dict_entry):
+        """
+        :return: the entry with the longest word that dict_entry.word starts with, None if there is no such entry.
+        If there are more entries of the same word as dict_entry, the one added before dict_entry is returned.
+        """
+        node = self.root
+        prefix = None
+        for c in dict_entry.word:
+            entries = node.get(ENTRIES)
+            if entries:
+                prefix = entries[-1]
+            node = node.get(c)
+            if node is None:
+                return prefix
+
+        # same word, different transcript
+        entries = node.get(ENTRIES, [])
+        for ind, same_word in enumerate(entries):
+            if same_word is dict_entry:
+                return entries[ind - 1] if ind > 0 else prefix
+        return entries[-1] if entries else prefix
+
+    def extensions(self, word):
+        """
+        :return: all entries whose word starts with word, including the entries of word itself
+        """
+        node = self._node(word)
+        result = []
+        if node is None:
+            return result
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for key, child in node.items():
+                if key is ENTRIES:
+                    result.extend(child)
+                else:
+                    stack.append(child)
+        return result
+
+    def set_entry_stress(self, current):
+        """
+        Set the stress of current from its longest prefix word, see set_stress(). The stress of the prefix word
+        has to be set already.
+        """
+        for syll in current.syllables:
+            syll.stress = 0
+        current.syllables[0].stress = PRIMARY_STRESS
+        modifier = self.longest_prefix(current)
+        if modifier is not None:
+            synchronize_stress(modifier, current)
+            if should_add_primary_stress(current, modifier):
+                current.syllables[len(modifier.syllables)].stress = PRIMARY_STRESS
+
+    def insert(self, dict_entry):
+        """
+        Add a new entry and set its stress, as well as the stress of all words starting with the new word.
+        :return: the list of entries whose stress was (re)set
+        """
+        self.add(dict_entry)
+        return self.update(dict_entry.word)
+
+    def update(self, word):
+        """
+        Reset the stress of word and all words starting with word, e.g. after an entry was added or removed.
+        :return: the list of entries whose stress was (re)set
+        """
+        affected = self.extensions(word)
+        # shorter words first, such that the stress of a prefix is always set before it is used
+        affected.sort(key=lambda x: len(x.word))
+        for dict_entry in affected:
+            self.set_entry_stress(dict_entry)
+        return affected
+
+
 def set_stress(syllabified_words):
     """
     Performs a simple stress-setting algorithm:
@@ -89,34 +202,14 @@ def set_stress(syllabified_words):
         verslunareigandi -> ve'rslunarei'gandi  (compound: primary stress on head word)
         verslunarinnar -> ve'rslunarinnar   (ending: no stress)
 
-    :param syllabified_words: alphabetical sorted list of syllabified words
+    The word a longer word starts with is looked up in a StressTrie, the input does not have to be sorted.
+
+    :param syllabified_words: list of syllabified words
     :return: a list of syllabified words with stress marks on each syllable
     """
-    result_list = []
-    modifiers = []
-    last_word = entry.PronDictEntry('')
-    for current in syllabified_words:
-        current.syllables[0].stress = PRIMARY_STRESS
-        if current.word.startswith(last_word.word):
-            synchronize_stress(last_word, current)
-            if len(last_word.word) > 1:
-                modifiers.append(last_word)
-            if should_add_primary_stress(current, last_word):
-                current.syllables[len(last_word.syllables)].stress = PRIMARY_STRESS
-        else:
-            mod_len = len(modifiers)
-            while mod_len > 0:
-                mod_len -= 1
-                if current.word.startswith(modifiers[mod_len].word):
-                    synchronize_stress(modifiers[mod_len], current)
-                    if should_add_primary_stress(current, modifiers[mod_len]):
-                        current.syllables[len(modifiers[mod_len].syllables)].stress = PRIMARY_STRESS
-                    break
-                else:
-                    modifiers.pop()
-                    mod_len = len(modifiers)
-
-        result_list.append(current)
-        last_word = current
+    trie = StressTrie(syllabified_words)
+    # stable sort by length: prefixes first, entries of the same word keep their order
+    for current in sorted(syllabified_words, key=lambda x: len(x.word)):
+        trie.set_entry_stress(current)
 
-    return result_list
+    return list(syllabified_words)
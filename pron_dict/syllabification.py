@@ -32,13 +32,18 @@ Thus it is important to perform compound analysis before applying the core sylla
 
 """
 
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
 import pron_dict.syllable as syllable
 
 
 # each syllable has a vowel as a nucleus. 'e' and 'o' aren't actually in the inventory, but we need
 # to be able to identify 'ei' and 'ou' from the first character only. 'P' is the replacement for '9' in Ossian format.
-VOWELS = ['a', 'a:', 'O', 'O:', 'u', 'u:', '9', '9:', 'Y', 'Y:', 'E', 'E:', 'I', 'I:', 'i', 'i:',
-          'ai', 'ai:', 'au', 'au:', 'ou', 'ou:', '9Y', '9Y:', 'Oi', 'Yi', 'ei', 'ei:', 'e', 'o', 'P', 'P:', 'PY', 'PY:']
+VOWELS = frozenset(['a', 'a:', 'O', 'O:', 'u', 'u:', '9', '9:', 'Y', 'Y:', 'E', 'E:', 'I', 'I:', 'i', 'i:',
+                    'ai', 'ai:', 'au', 'au:', 'ou', 'ou:', '9Y', '9Y:', 'Oi', 'Yi', 'ei', 'ei:', 'e', 'o',
+                    'P', 'P:', 'PY', 'PY:'])
 
 # these consonant clusters should not be divided between two syllables
 # the general rule is: p, t, k, s, b, d, g, f + v, j, r. But not all of these combinations are
@@ -46,6 +51,9 @@ VOWELS = ['a', 'a:', 'O', 'O:', 'u', 'u:', '9', '9:', 'Y', 'Y:', 'E', 'E:', 'I',
 CONS_CLUSTERS = ['s v', 's j', 'p j', 'p r', 't v', 't j', 't r', 'k v', 'k j', 'k r',
                  'p_h j', 'p_h r', 't_h v', 't_h j', 't_h r', 'k_h v', 'k_h j', 'k_h r', 'f r', 'f j']
 
+# max number of compound components kept in the leaf syllabification cache
+LEAF_CACHE_SIZE = 50000
+
 
 def syllabify_on_nucleus(transcription_arr):
     """
@@ -70,8 +78,10 @@ def syllabify_on_nucleus(transcription_arr):
 
 def identify_clusters(entry):
     for syll in entry.syllables:
+        # all clusters consist of two phones, only the last two phones of the syllable need to be compared
+        last_two = ' '.join(syll.phones[-2:])
         for clust in CONS_CLUSTERS:
-            if syll.content.strip().endswith(clust):
+            if last_two.endswith(clust):
                 syll.cons_cluster = clust
 
 
@@ -91,7 +101,7 @@ def syllabify_final(entry):
         prev_syll = entry.syllables[ind - 1]
         # syllable after the first syllable starts with a vowel - look for consonant onset in previous syllable
         # and move the consonant / consonant cluster from the previous to the current syllable
-        if ind > 0 and syll.content[0] in VOWELS:
+        if ind > 0 and syll.phones[0][0] in VOWELS:
             if prev_syll.cons_cluster:
                 # copy cons_cluster to next syllable
                 syll.append_before(prev_syll.cons_cluster)
@@ -102,11 +112,11 @@ def syllabify_final(entry):
                 if prev_syll.endswith('j') and syll.startswith('E'):
                     phone = prev_syll.last_phones(1)
                     syll.append_before(phone)
-                    prev_syll.content = prev_syll.content[:-(len(phone)+1)]
+                    prev_syll.remove_last()
                 else:
                     phone = prev_syll.last_phones()
                     syll.append_before(phone)
-                    prev_syll.content = prev_syll.content[:-(len(phone)+1)]
+                    prev_syll.remove_last()
                 entry.update_syllables(ind, prev_syll, syll)
 
 
@@ -117,39 +127,253 @@ def syllabify_entry(entry):
     syllabify_final(entry)
 
 
-def syllabify_tree(entry_tree, syllables):
+class LeafSyllableCache:
+    """
+    Bounded LRU cache for the syllabification of compound tree leaves, keyed on (word, transcript).
+
+    Frequent compound components ('-maður', '-legur', ...) are syllabified once, the cached value is an
+    immutable tuple of syllable start indices shared by all compounds containing the component. Each leaf still
+    gets its own Syllable objects, since stress is set per syllable later on.
+    """
+
+    def __init__(self, maxsize=LEAF_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._starts = OrderedDict()
+
+    def __len__(self):
+        return len(self._starts)
+
+    def syllabify(self, entry):
+        """
+        Set the syllables of entry, from the cache if possible.
+        :return: the syllable start indices of entry
+        """
+        key = (entry.word, entry.transcript)
+        starts = self._starts.get(key)
+        if starts is not None:
+            self.hits += 1
+            self._starts.move_to_end(key)
+            phones = entry.transcription_arr
+            ends = starts[1:] + (len(phones),)
+            entry.syllables = [syllable.Syllable(phones[start:end]) for start, end in zip(starts, ends)]
+            return starts
+
+        self.misses += 1
+        syllabify_entry(entry)
+        starts = []
+        pos = 0
+        for syll in entry.syllables:
+            starts.append(pos)
+            pos += len(syll.phones)
+        starts = tuple(starts)
+        self._starts[key] = starts
+        if len(self._starts) > self.maxsize:
+            self._starts.popitem(last=False)
+        return starts
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+    def statistics(self):
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate(),
+                'size': len(self._starts), 'maxsize': self.maxsize}
+
+    def clear(self):
+        self._starts.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# shared by all calls of syllabify_tree_dict(), see LEAF_CACHE.statistics() for the hit rate
+LEAF_CACHE = LeafSyllableCache()
+
+
+def syllabify_tree(entry_tree, syllables, cache=None):
     """
     Recursively call syllabification on each element of entry_tree.
     Add up the syllables of the leaf nodes to build the syllable structure of the root element.
     :param entry_tree: a binary tree of a compound structure, the tree might not have any leaves,
     i.e. is not necessarily a compound
     :param syllables: an array to add up the leaf syllables of the tree
+    :param cache: optional LeafSyllableCache, leaves already syllabified are taken from the cache
     :return:
     """
     if not entry_tree.left:
-        syllabify_entry(entry_tree.elem)
+        if cache is None:
+            syllabify_entry(entry_tree.elem)
+        else:
+            cache.syllabify(entry_tree.elem)
         syllables += entry_tree.elem.syllables
     if entry_tree.left:
-        syllabify_tree(entry_tree.left, syllables)
+        syllabify_tree(entry_tree.left, syllables, cache)
     if entry_tree.right:
-        syllabify_tree(entry_tree.right, syllables)
+        syllabify_tree(entry_tree.right, syllables, cache)
 
 
-def syllabify_tree_dict(tree_dict):
+def syllabify_tree_dict(tree_dict, cache=LEAF_CACHE):
     """
     Syllabifies each entry in tree_dict
     :param tree_dict: a list of compoundTrees to syllabify
+    :param cache: a LeafSyllableCache for the leaves of the trees, None to syllabify every leaf from scratch
     :return: a list of syllabified PronDictEntries. Note that the returned list does NOT contain tree elements any more,
     but simple PronDictEntries.
     """
     syllabified = []
     for t in tree_dict:
         syllables = []
-        syllabify_tree(t, syllables)
+        syllabify_tree(t, syllables, cache)
         t.elem.syllables = syllables
         syllabified.append(t.elem)
 
     return syllabified
 
 
+class SyllableBoundaries:
+    """
+    Syllabification result for a whole lexicon: the start index of each syllable, relative to the start of
+    the transcript of its entry, stored in one flat array. The syllable starts of entry i are
+    self.starts[self.offsets[i]:self.offsets[i + 1]].
+    """
+
+    def __init__(self, starts=None, offsets=None):
+        self.starts = starts if starts is not None else array('H')
+        self.offsets = offsets if offsets is not None else array('L', [0])
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        return self.starts[self.offsets[index]: self.offsets[index + 1]]
+
+    def extend(self, other):
+        base = self.offsets[-1]
+        self.starts.extend(other.starts)
+        self.offsets.extend([base + off for off in other.offsets[1:]])
 
+    def syllables(self, lexicon, index):
+        """
+        :return: the syllables of entry index of lexicon, each syllable as a list of phones
+        """
+        phones = lexicon.phone_list(index)
+        starts = list(self[index]) + [len(phones)]
+        return [phones[starts[i]: starts[i + 1]] for i in range(len(starts) - 1)]
+
+
+def _syllabify_ids(phones, offsets, vowel_mask, initial_vowel_mask, clusters):
+    """
+    The syllabification algorithm of syllabify_entry(), on phone IDs. See BatchSyllabifier.
+    """
+    starts = array('H')
+    syll_offsets = array('L', [0])
+    for ind in range(len(offsets) - 1):
+        begin = offsets[ind]
+        end = offsets[ind + 1]
+        # 1) and 2): a new syllable starts at each vowel after the first one
+        nucleus_starts = [begin]
+        has_nucleus = False
+        for pos in range(begin, end):
+            if vowel_mask[phones[pos]]:
+                if has_nucleus:
+                    nucleus_starts.append(pos)
+                has_nucleus = True
+
+        # 3) and 4): move a consonant cluster or a single consonant to the onset of the next syllable
+        starts.append(0)
+        for j in range(1, len(nucleus_starts)):
+            boundary = nucleus_starts[j]
+            if initial_vowel_mask[phones[boundary]]:
+                if boundary - 2 >= nucleus_starts[j - 1] and \
+                        (phones[boundary - 2], phones[boundary - 1]) in clusters:
+                    boundary -= 2
+                elif not vowel_mask[phones[boundary - 1]]:
+                    boundary -= 1
+            starts.append(boundary - begin)
+        syll_offsets.append(len(starts))
+
+    return starts, syll_offsets
+
+
+def _syllabify_chunk(args):
+    starts, syll_offsets = _syllabify_ids(*args)
+    return SyllableBoundaries(starts, syll_offsets)
+
+
+class BatchSyllabifier:
+    """
+    Syllabifies all entries of a Lexicon (see lexicon.py) in one pass over its phone ID array, giving the
+    same results as syllabify_entry(). Instead of Syllable objects, the result is a SyllableBoundaries object.
+
+    The vowel test is a lookup in a bytearray indexed by phone ID, consonant clusters are looked up by the
+    IDs of the last two phones of a syllable.
+
+        syllabifier = BatchSyllabifier(lexicon.inventory)
+        boundaries = syllabifier.syllabify(lexicon)
+
+    """
+
+    def __init__(self, inventory):
+        self.inventory = inventory
+        self.vowel_mask = bytearray()
+        self.initial_vowel_mask = bytearray()
+        self.clusters = set()
+        self.update()
+
+    def update(self):
+        """
+        Extend the lookup tables to phones added to the inventory since the last update.
+        """
+        for phone in self.inventory.symbols[len(self.vowel_mask):]:
+            self.vowel_mask.append(phone in VOWELS)
+            # syllabify_final() only looks at the first character of the following syllable
+            self.initial_vowel_mask.append(phone[0] in VOWELS)
+
+        ids = self.inventory.ids
+        self.clusters = set()
+        for clust in CONS_CLUSTERS:
+            first, second = clust.split()
+            if first in ids and second in ids:
+                self.clusters.add((ids[first], ids[second]))
+
+    def syllabify_ids(self, phone_ids):
+        """
+        :param phone_ids: the phone IDs of one transcript
+        :return: the syllable start indices
+        """
+        if len(self.vowel_mask) < len(self.inventory):
+            self.update()
+        starts, syll_offsets = _syllabify_ids(phone_ids, [0, len(phone_ids)], self.vowel_mask,
+                                              self.initial_vowel_mask, self.clusters)
+        return starts
+
+    def syllabify(self, lexicon, processes=1):
+        """
+        :param lexicon: a Lexicon sharing the inventory of this syllabifier
+        :param processes: if larger than 1, the lexicon is divided into chunks processed in a process pool
+        :return: SyllableBoundaries for all entries of lexicon
+        """
+        if lexicon.inventory is not self.inventory:
+            raise ValueError('Lexicon does not use the phone inventory of the syllabifier')
+        if len(self.vowel_mask) < len(self.inventory):
+            self.update()
+
+        if processes <= 1 or len(lexicon) < processes:
+            return _syllabify_chunk((lexicon.phones, lexicon.offsets, self.vowel_mask,
+                                     self.initial_vowel_mask, self.clusters))
+
+        chunk_size = -(-len(lexicon) // processes)
+        chunks = []
+        for first in range(0, len(lexicon), chunk_size):
+            last = min(first + chunk_size, len(lexicon))
+            begin = lexicon.offsets[first]
+            offsets = array('L', [off - begin for off in lexicon.offsets[first: last + 1]])
+            chunks.append((lexicon.phones[begin: lexicon.offsets[last]], offsets, self.vowel_mask,
+                           self.initial_vowel_mask, self.clusters))
+
+        boundaries = SyllableBoundaries()
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            for result in executor.map(_syllabify_chunk, chunks):
+                boundaries.extend(result)
+        return boundaries
@@ -7,13 +7,19 @@ class Syllable:
     Syllabification processes phonetic transcripts of words, where each phone is separated by a space. This space
     separated transcription represents the content field of a Syllable object.
     Note that some phones might be written as two characters.
+
+    The phones are stored as a list, the content string is only built when requested and cached until the
+    phones change.
     """
 
-    def __init__(self):
-        self.content = '' #the transcription of the syllable, space between each phone
+    __slots__ = ('phones', 'has_nucleus', 'cons_cluster', 'stress', '_content')
+
+    def __init__(self, phones=None):
+        self.phones = list(phones) if phones else []  # the phones of the syllable
         self.has_nucleus = False
         self.cons_cluster = None
         self.stress = 0
+        self._content = None
 
     def __str__(self):
         return self.content
@@ -21,11 +27,37 @@ class Syllable:
     def __repr__(self):
         return self.content
 
-    def append(self, phone_str):
-        self.content += phone_str + ' '
+    @property
+    def content(self):
+        """
+        the transcription of the syllable, space after each phone
+        """
+        if self._content is None:
+            self._content = ''.join([p + ' ' for p in self.phones])
+        return self._content
+
+    @content.setter
+    def content(self, content):
+        self.phones = content.split()
+        self._content = None
+
+    def append(self, phone):
+        self.phones.append(phone)
+        self._content = None
 
     def append_before(self, phone_str):
-        self.content = phone_str + ' ' + self.content
+        """
+        :param phone_str: one phone or space separated phones (e.g. a consonant cluster)
+        """
+        self.phones[0:0] = phone_str.split()
+        self._content = None
+
+    def remove_last(self, number=1):
+        """
+        remove number last phones from the syllable
+        """
+        del self.phones[-number:]
+        self._content = None
 
     def last_phones(self, number=1):
         """
@@ -33,10 +65,8 @@ class Syllable:
         :param number: number of last phones to return
         :return:
         """
-        phone_arr = self.content.split()
-        if number <= len(phone_arr):
-            result_phones = phone_arr[-number:]
-            return ' '.join(result_phones)
+        if number <= len(self.phones):
+            return ' '.join(self.phones[-number:])
         raise IndexError('Number of phones to large: ' + str(number)
                          + ' is larger than length of content (' + self.content + ')')
 
@@ -49,12 +79,12 @@ class Syllable:
         return ind
 
     def startswith(self, phone):
-        if self.content[0] == phone:
+        if self.phones[0][0] == phone:
             return True
         return False
 
     def endswith(self, phone):
-        if self.content[self.last_index()] == phone:
+        if self.phones[-1][-1] == phone:
             return True
         return False
 
@@ -65,4 +95,5 @@ class Syllable:
             return -1
 
     def remove_cluster(self):
-        self.content = self.content[:self.index_of_cluster()]
+        if self.cons_cluster:
+            self.remove_last(len(self.cons_cluster.split()))
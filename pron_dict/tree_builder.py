@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+from array import array
+from collections import OrderedDict
+
 from dict_database import comp_dict_db
 from dict_database import pron_dict_db
-import entry
+from pron_dict import entry
+from pron_dict.lexicon import PhoneInventory, base_symbol
 
 
 VOWELS = ['a', 'á', 'e', 'é', 'i', 'í', 'o', 'ó', 'u', 'ú', 'y', 'ý', 'ö']
@@ -13,6 +17,19 @@ TRANSCR_MAP = pron_dict_db.get_transcriptions_map()
 MIN_COMP_LEN = 4
 MIN_INDEX = 2       # the position from which to start searching for a head word
 
+# word -> (modifier, head), the division of a word only depends on the word string, see split_compound().
+# Least recently used first, at most SPLIT_MEMO_SIZE words are kept, such that long running lookups of unknown
+# words (pron_service.py, transcribe_text.py) do not fill the memory
+SPLIT_MEMO = OrderedDict()
+SPLIT_MEMO_SIZE = 200000
+
+# phone IDs of the transcripts matched in find_head(). BASE_IDS maps each phone ID to the ID of the phone
+# without length, voicelessness and aspiration marks ('a:' -> 'a', 'r_0' -> 'r', 't_h' -> 't')
+INVENTORY = PhoneInventory()
+BASE_IDS = array('H')
+# head transcript -> (phone IDs, normalised phone IDs), the same heads are matched against many compounds
+HEAD_IDS = {}
+
 
 class CompoundTree:
     def __init__(self, pron_dict_entry):
@@ -37,36 +54,60 @@ def contains_vowel(word):
     return False
 
 
-def compare_transcripts(comp_transcript, head_transcript):
+def normalise(phone_ids):
     """
-    If a transcript differs only in a length mark or in voiced/voiceless or having post aspriation or not,
-    it should be recognized as the same transcript (since we have already matched the corresponding word strings)
+    :param phone_ids: phone IDs from INVENTORY
+    :return: an array of the IDs of the phones without length, voicelessness and aspiration marks
     """
+    while len(BASE_IDS) < len(INVENTORY):
+        BASE_IDS.append(INVENTORY.intern(base_symbol(INVENTORY.symbols[len(BASE_IDS)])))
+    return array('H', [BASE_IDS[p] for p in phone_ids])
 
-    head_ind = len(head_transcript) - 1
-    comp_ind = len(comp_transcript) - 1
 
-    while head_ind >= 0:
-        head_char = head_transcript[head_ind]
-        comp_char = comp_transcript[comp_ind]
-        if head_char == comp_char:
-            head_ind -= 1
-            comp_ind -= 1
-        elif head_char == ':':
-            head_ind -= 1
-        elif comp_char == ':':
-            comp_ind -= 1
-        elif head_char == '0' or head_char == 'h':
-            head_ind -= 2
-        elif comp_char == '0' or comp_char == 'h':
-            comp_ind -= 2
-        else:
+def rfind_phones(phone_ids, sub_ids):
+    """
+    :return: the phone index of the last occurrence of sub_ids in phone_ids, -1 if not found
+    """
+    data = phone_ids.tobytes()
+    key = sub_ids.tobytes()
+    end = len(data)
+    while True:
+        ind = data.rfind(key, 0, end)
+        if ind < 0:
             return -1
-
-    return comp_ind + 1 # make up for the last iteration where head_ind went below 0
+        if ind % phone_ids.itemsize == 0:
+            return ind // phone_ids.itemsize
+        # match starting in the middle of a phone ID
+        end = ind + len(key) - 1
 
 
-def extract_transcription(entry, comp_head):
+def find_head(comp_ids, head_ids, head_base=None):
+    """
+    Find the transcript of a compound head in the transcript of the compound. If the head transcript does not
+    occur as it is, it should be the end of the compound transcript, differing only in a length mark or in
+    voiced/voiceless or having post aspiration or not (since we have already matched the corresponding word
+    strings).
+
+    :param comp_ids: the phone IDs of the compound transcript
+    :param head_ids: the phone IDs of the head transcript
+    :param head_base: normalise(head_ids), if already known
+    :return: the split point between modifier and head in phones, -1 if the head transcript was not found
+    """
+    if len(head_ids) == 0 or len(head_ids) > len(comp_ids):
+        return -1
+    ind = rfind_phones(comp_ids, head_ids)
+    # a match at index 0 leaves no modifier, try the comparison of the end of the compound transcript
+    if ind > 0:
+        return ind
+    split = len(comp_ids) - len(head_ids)
+    if head_base is None:
+        head_base = normalise(head_ids)
+    if normalise(comp_ids[split:]) == head_base:
+        return split
+    return -1
+
+
+def extract_transcription(entry, comp_head, transcr_map=TRANSCR_MAP):
     """
     Get the transcript of comp_head from the pron. dictionary and try to match it with the transcript of
     the whole entry. We are somewhat flexible here: length symbol, voicelessness or postaspiration do not
@@ -77,23 +118,41 @@ def extract_transcription(entry, comp_head):
 
     :param entry: PronDictEntry of the compound being analysed
     :param comp_head: the head of the compound as string
+    :param transcr_map: a mapping word -> transcript to look up the transcript of comp_head
     :return:
     """
+    return split_transcript(entry.transcript, comp_head, transcr_map)
 
-    head_transcr = TRANSCR_MAP[comp_head] if comp_head in TRANSCR_MAP else 'NO_TRANSCRIPT'
-    head_syllable_index = entry.transcript.rfind(head_transcr)
 
-    if head_syllable_index <= 0:
-       head_syllable_index = compare_transcripts(entry.transcript, head_transcr)
-    if head_syllable_index <= 0:
-        #print("did not find transcription of " + comp_head + "!")
-        #print("transcription in db: " + head_transcr + ", compound transcr: " + entry.transcript)
+def split_transcript(transcript, comp_head, transcr_map=TRANSCR_MAP):
+    """
+    See extract_transcription()
+    :param transcript: the transcript of the compound
+    :return: the transcripts of modifier and head, empty strings if the head transcript was not found
+    """
+    phones = transcript.split()
+    split = split_phones(INVENTORY.encode(phones), comp_head, transcr_map)
+    if split <= 0:
         return '', ''
+    return ' '.join(phones[:split]), ' '.join(phones[split:])
 
-    else:
-        modifier_transcr = entry.transcript[0:head_syllable_index]
-        head_transcr = entry.transcript[head_syllable_index:]
-        return modifier_transcr, head_transcr
+
+def split_phones(comp_ids, comp_head, transcr_map=TRANSCR_MAP):
+    """
+    :param comp_ids: the phone IDs (from INVENTORY) of the compound transcript
+    :param comp_head: the head of the compound as string
+    :return: the split point between modifier and head in phones, -1 if the head transcript was not found
+    """
+    if comp_head not in transcr_map:
+        #print("did not find transcription of " + comp_head + "!")
+        return -1
+    head_transcr = transcr_map[comp_head]
+    head = HEAD_IDS.get(head_transcr)
+    if head is None:
+        head_ids = INVENTORY.encode(head_transcr)
+        head = (head_ids, normalise(head_ids))
+        HEAD_IDS[head_transcr] = head
+    return find_head(comp_ids, *head)
 
 
 def lookup_compound_components(word):
@@ -131,35 +190,83 @@ def lookup_compound_components(word):
     return mod, longest_valid_head
 
 
-def extract_compound_components(comp_tree):
+def split_compound(word):
+    """
+    Memoized version of lookup_compound_components(), components of compounds are looked up many times
+    when decomposing a whole dictionary.
     """
-    As long as compound components can be extracted, extract compound components and their transcripts recursively.
+    components = SPLIT_MEMO.get(word)
+    if components is not None:
+        SPLIT_MEMO.move_to_end(word)
+    else:
+        components = lookup_compound_components(word)
+        SPLIT_MEMO[word] = components
+        if len(SPLIT_MEMO) > SPLIT_MEMO_SIZE:
+            SPLIT_MEMO.popitem(last=False)
+    return components
+
+
+def extract_compound_components(comp_tree, transcr_map=TRANSCR_MAP):
+    """
+    As long as compound components can be extracted, extract compound components and their transcripts.
+    The tree is built iteratively with an explicit stack of nodes still to be divided.
 
     :param comp_tree: a tree containing one root element. If compound components are found, they are added
     as children of the root.
+    :param transcr_map: a mapping word -> transcript, see extract_transcription()
     :return:
     """
-    mod, head = lookup_compound_components(comp_tree.elem.word)
-    if len(mod) > 0 and len(head) > 0:
-        mod_transcr, head_transcr = extract_transcription(comp_tree.elem, head)
-        if len(mod_transcr) > 0 and len(head_transcr) > 0:
-            left_elem = entry.PronDictEntry(mod, mod_transcr)
-            left_tree = CompoundTree(left_elem)
-            comp_tree.left = left_tree
-            right_elem = entry.PronDictEntry(head, head_transcr)
-            right_tree = CompoundTree(right_elem)
-            comp_tree.right = right_tree
-            extract_compound_components(left_tree)
-            extract_compound_components(right_tree)
-
-
-def build_compound_tree(entry):
+    stack = [comp_tree]
+    while stack:
+        node = stack.pop()
+        mod, head = split_compound(node.elem.word)
+        if len(mod) > 0 and len(head) > 0:
+            mod_transcr, head_transcr = split_transcript(node.elem.transcript, head, transcr_map)
+            if len(mod_transcr) > 0 and len(head_transcr) > 0:
+                node.left = CompoundTree(entry.PronDictEntry(mod, mod_transcr))
+                node.right = CompoundTree(entry.PronDictEntry(head, head_transcr))
+                stack.append(node.right)
+                stack.append(node.left)
+
+
+def build_compound_tree(entry, transcr_map=TRANSCR_MAP):
     """
     :param entry: a PronDictEntry
+    :param transcr_map: a mapping word -> transcript for the compound heads, defaults to the transcripts
+    in the dictionary database
     :return: a binary tree based on compound division
     """
 
     comp_tree = CompoundTree(entry)
-    extract_compound_components(comp_tree)
+    extract_compound_components(comp_tree, transcr_map)
     return comp_tree
 
+
+def compound_leaves(word, transcript, transcr_map=TRANSCR_MAP):
+    """
+    Same compound division as build_compound_tree(), but without building a tree: returns the leaves of the
+    tree as spans of word and transcript.
+
+    :param word: the word to divide
+    :param transcript: the transcript of word, phones space separated
+    :param transcr_map: see build_compound_tree()
+    :return: a list of (word start, word end, phone start, phone end) tuples, one for each leaf from left
+    to right. A word that is not a compound has one leaf spanning word and transcript.
+    """
+    leaves = []
+    phone_ids = INVENTORY.encode(transcript)
+    # (word start, word end, phone start, phone end) of the components still to be divided
+    stack = [(0, len(word), 0, len(phone_ids))]
+    while stack:
+        span = stack.pop()
+        w_start, w_end, p_start, p_end = span
+        mod, head = split_compound(word[w_start:w_end])
+        if len(mod) > 0 and len(head) > 0:
+            split = split_phones(phone_ids[p_start:p_end], head, transcr_map)
+            if split > 0:
+                # the head is the end of the word, the modifier is not necessarily the rest of the word
+                stack.append((w_end - len(head), w_end, p_start + split, p_end))
+                stack.append((w_start, w_start + len(mod), p_start, p_start + split))
+                continue
+        leaves.append(span)
+    return leaves
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pronunciation lookup service.
+
+Loads a pronunciation dictionary (e.g. data/08_final_version/IPD_IPA_clean.csv, or a binary lexicon written by
+step 10 of main.py) into an indexed in-memory store and answers word lookups over a TCP or UNIX socket. A word
+is resolved by the first of:
+
+    lexicon     the transcript of the word in the dictionary
+    compound    the transcript synthesised from the transcripts of the compound components of the word, looked up
+                in the dictionary or in the compound database (TRANSCR_MAP), see compound_synthesis.py. With
+                --min_confidence, synthesised transcripts of a lower confidence are not used
+    g2p         the transcript decoded by a Sequitur model (see g2p_decoder.py), optionally stored in a
+                persistent cache (see g2p_cache.py)
+
+Decoding runs in a thread pool, such that lexicon lookups are not blocked by g2p. Concurrent requests for the same
+unknown word are coalesced: the word is decoded once, all requests wait for the same result.
+
+The g2p models and the compound database use X-SAMPA. With an IPA dictionary, their transcripts are converted
+to IPA by the symbol map given with --phone_map.
+
+Protocol: the client sends one word per line, the service answers each line with
+
+    word\ttranscript\tsource
+
+where source is one of 'lexicon', 'compound', 'g2p' or 'unknown' (transcript empty).
+
+Usage:
+
+    python3 pron_service.py --model g2p_model --cache_file g2p_cache.db --port 8110
+    echo hestur | nc localhost 8110
+
+"""
+
+import sys
+import asyncio
+import argparse
+import unicodedata
+import concurrent.futures
+
+from pron_dict import tree_builder
+from pron_dict.lexicon import Lexicon
+from pron_dict.binary_lexicon import BinaryLexicon
+from pron_dict.compound_synthesis import CompoundSynthesiser
+from processors.ipa2x_sampa import load_converter, UNMAPPED
+import g2p_decoder
+from g2p_cache import G2PCache
+
+LEXICON = 'lexicon'
+COMPOUND = 'compound'
+G2P = 'g2p'
+UNKNOWN = 'unknown'
+SOURCES = [LEXICON, COMPOUND, G2P, UNKNOWN]
+
+
+class LexiconIndex:
+    """
+    A Lexicon with a word index, lookup() has the same interface as BinaryLexicon.lookup()
+    """
+
+    def __init__(self, lexicon):
+        self.lexicon = lexicon
+        self.index = {}     # word -> list of entry indices
+        for ind, word in enumerate(lexicon.words):
+            self.index.setdefault(word, []).append(ind)
+
+    def __len__(self):
+        return len(self.lexicon)
+
+    def __contains__(self, word):
+        return word in self.index
+
+    def lookup(self, word):
+        """
+        :return: a list of all transcripts of word, empty if word is not in the lexicon
+        """
+        return [self.lexicon.transcript(ind) for ind in self.index.get(word, ())]
+
+
+def load_lexicon(filename):
+    """
+    :param filename: a dictionary file 'word\tt r a n s c r i p t' or a binary lexicon (*.lex)
+    :return: a LexiconIndex or a BinaryLexicon
+    """
+    if filename.endswith('.lex'):
+        return BinaryLexicon(filename)
+    return LexiconIndex(Lexicon.from_file(filename))
+
+
+def convert_transcript(converter, transcript):
+    """
+    :param converter: a TranscriptionConverter, or None
+    :return: the converted transcript, None if it contains a symbol not in the symbol map of converter
+    """
+    if converter is None or transcript is None:
+        return transcript
+    phone_ids = converter.convert_ids(converter.source.encode(transcript))
+    if UNMAPPED in phone_ids:
+        return None
+    return converter.target.decode(phone_ids)
+
+
+class PronunciationResolver:
+
+    def __init__(self, lexicon, decoder=None, cache=None, transcr_map=tree_builder.TRANSCR_MAP, converter=None,
+                 workers=1, min_confidence=0.0):
+        """
+        :param lexicon: a LexiconIndex or a BinaryLexicon, None if only decode() is used
+        :param decoder: a GraphoneDecoder for words that are neither in the lexicon nor compounds, None for no g2p
+        :param cache: an optional G2PCache for the decoder, only accessed from the thread calling resolve()
+        :param transcr_map: a mapping word -> transcript for compound components not in the lexicon
+        :param converter: an optional TranscriptionConverter from the phone set of decoder and transcr_map to the
+        phone set of the lexicon
+        :param workers: number of threads decoding words
+        :param min_confidence: compound transcripts of a lower confidence are not used, see compound_synthesis.py
+        """
+        self.lexicon = lexicon
+        self.decoder = decoder
+        self.cache = cache
+        self.transcr_map = transcr_map if transcr_map is not None else {}
+        self.converter = converter
+        self.workers = workers
+        self.min_confidence = min_confidence
+        self.synthesiser = CompoundSynthesiser(self.lexicon_transcript, self.mapped_transcript)
+        self.executor = None    # created on first decode
+        self.pending = {}       # word -> task decoding the word
+        self.counts = {source: 0 for source in SOURCES}
+        self.decodes = 0
+        self.coalesced = 0
+
+    def lexicon_transcript(self, word):
+        transcripts = self.lexicon.lookup(word)
+        return transcripts[0] if transcripts else None
+
+    def mapped_transcript(self, word):
+        """
+        :return: the transcript of word in transcr_map, converted to the phone set of the lexicon
+        """
+        if word not in self.transcr_map:
+            return None
+        return convert_transcript(self.converter, self.transcr_map[word])
+
+    def lookup(self, word):
+        """
+        Resolve word without g2p.
+        :return: (transcript, source), (None, UNKNOWN) if word is neither in the lexicon nor a compound
+        """
+        for key in keys(word):
+            transcr = self.lexicon_transcript(key)
+            if transcr is not None:
+                return transcr, LEXICON
+        for key in keys(word):
+            synthesised = self.synthesiser.synthesise(key)
+            if synthesised is not None and synthesised[1] >= self.min_confidence:
+                return synthesised[0], COMPOUND
+        return None, UNKNOWN
+
+    def decode(self, word):
+        """
+        Decode word with g2p, without using the cache. Can be called from any thread.
+        :return: the transcript of the decoder, NFKD normalised like in G2P_Experiment.get_native_pronunciation(),
+        '' if word can not be transcribed. See convert() for the transcript in the phone set of the lexicon.
+        """
+        transcr = self.decoder.transcribe(word)
+        if transcr is None:
+            return ''
+        return unicodedata.normalize('NFKD', transcr)
+
+    def convert(self, transcr):
+        """
+        :param transcr: a transcript returned by decode() or cached()
+        :return: transcr in the phone set of the lexicon, None if it is empty or can not be converted
+        """
+        if not transcr:
+            return None
+        return convert_transcript(self.converter, unicodedata.normalize('NFC', transcr))
+
+    def cached(self, word):
+        """
+        The cache holds the transcripts as returned by decode(), such that it can be shared with g2p_experiment.py
+        and with services using another phone map.
+        :return: the transcript of word in the cache, '' if decoding word failed before, None if not in the cache
+        """
+        if self.cache is None:
+            return None
+        return self.cache.get(word)
+
+    def store(self, word, transcr):
+        """
+        :param transcr: a transcript returned by decode()
+        """
+        if self.cache is not None:
+            self.cache.put(word, transcr)
+
+    def count(self, transcr, source):
+        """
+        Count the resolved word for the statistics, an empty transcript counts as UNKNOWN
+        :return: (transcript, source)
+        """
+        if not transcr:
+            transcr, source = None, UNKNOWN
+        self.counts[source] += 1
+        return transcr, source
+
+    def resolve_sync(self, word):
+        """
+        :return: (transcript, source), transcript None if word can not be resolved
+        """
+        transcr, source = self.lookup(word)
+        if transcr is not None or self.decoder is None:
+            return self.count(transcr, source)
+        key = g2p_key(word)
+        transcr = self.cached(key)
+        if transcr is None:
+            self.decodes += 1
+            transcr = self.decode(key)
+            self.store(key, transcr)
+        return self.count(self.convert(transcr), G2P)
+
+    async def resolve(self, word):
+        """
+        Coroutine version of resolve_sync(), words not in the lexicon are decoded in the thread pool
+        """
+        transcr, source = self.lookup(word)
+        if transcr is not None or self.decoder is None:
+            return self.count(transcr, source)
+        key = g2p_key(word)
+        task = self.pending.get(key)
+        if task is None:
+            transcr = self.cached(key)
+            if transcr is not None:
+                return self.count(self.convert(transcr), G2P)
+            task = asyncio.ensure_future(self._decode(key))
+            self.pending[key] = task
+        else:
+            self.coalesced += 1
+        # a cancelled request must not cancel the decoding for the other requests
+        transcr = await asyncio.shield(task)
+        return self.count(self.convert(transcr), G2P)
+
+    async def _decode(self, key):
+        if self.executor is None:
+            self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            self.decodes += 1
+            transcr = await asyncio.get_running_loop().run_in_executor(self.executor, self.decode, key)
+            self.store(key, transcr)
+            return transcr
+        finally:
+            del self.pending[key]
+
+    def stats(self):
+        stats = dict(self.counts)
+        stats['decodes'] = self.decodes
+        stats['coalesced'] = self.coalesced
+        if self.cache is not None:
+            stats['cache'] = self.cache.stats()
+        return stats
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+        if self.cache is not None:
+            self.cache.close()
+
+
+def keys(word):
+    """
+    :return: the lexicon keys to try for word: the word itself and its lowercase form
+    """
+    word = unicodedata.normalize('NFC', word)
+    lower = word.lower()
+    return [word] if lower == word else [word, lower]
+
+
+def g2p_key(word):
+    return unicodedata.normalize('NFC', word.lower())
+
+
+def create_resolver(lexicon_file, model_file=None, cache_file=None, phone_map=None, workers=1, min_confidence=0.0):
+    """
+    :param phone_map: the IPA to X-SAMPA symbol map, if the lexicon is in IPA
+    :return: a PronunciationResolver
+    """
+    lexicon = load_lexicon(lexicon_file)
+    decoder = g2p_decoder.load_decoder(model_file) if model_file else None
+    cache = G2PCache(cache_file, model_file) if cache_file and model_file else None
+    converter = load_converter(phone_map).inverse() if phone_map else None
+    return PronunciationResolver(lexicon, decoder, cache, converter=converter, workers=workers,
+                                 min_confidence=min_confidence)
+
+
+async def handle_client(resolver, reader, writer):
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            word = line.decode('utf-8', errors='replace').strip()
+            if not word:
+                continue
+            transcr, source = await resolver.resolve(word)
+            writer.write((word + '\t' + (transcr or '') + '\t' + source + '\n').encode('utf-8'))
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(resolver, host='127.0.0.1', port=8110, socket_path=None):
+    def client_connected(reader, writer):
+        return handle_client(resolver, reader, writer)
+
+    if socket_path:
+        server = await asyncio.start_unix_server(client_connected, path=socket_path)
+    else:
+        server = await asyncio.start_server(client_connected, host, port)
+    for sock in server.sockets:
+        print('Serving pronunciations on ' + str(sock.getsockname()), file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Serves pronunciations from a lexicon, compound division and g2p',
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--lexicon', default='data/08_final_version/IPD_IPA_clean.csv',
+                        help='Pronunciation dictionary, a tab separated file or a binary lexicon (*.lex)')
+    parser.add_argument('--model', help='Sequitur g2p model for words not in the lexicon, no g2p if not given')
+    parser.add_argument('--cache_file', help='Persistent cache of the g2p transcripts, see g2p_cache.py')
+    parser.add_argument('--phone_map', default='data/00_phonesets/ipa_xsampa.txt',
+                        help='IPA to X-SAMPA symbol map, transcripts of g2p and the compound database are converted '
+                             'to IPA. Set to "" for an X-SAMPA lexicon.')
+    parser.add_argument('--workers', type=int, default=1, help='Number of threads decoding words with g2p')
+    parser.add_argument('--min_confidence', type=float, default=0.0,
+                        help='Use g2p instead of compound transcripts of a lower confidence')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8110)
+    parser.add_argument('--socket', help='Serve on this UNIX socket instead of TCP')
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    resolver = create_resolver(args.lexicon, args.model, args.cache_file, args.phone_map, args.workers,
+                               args.min_confidence)
+    try:
+        asyncio.run(serve(resolver, args.host, args.port, args.socket))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(resolver.stats(), file=sys.stderr)
+        resolver.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Profiling of the processing steps in main.py.
+
+A StepProfiler runs each step function and records for each step:
+
+    wall_s          wall clock time
+    cpu_s           CPU time of this process and of finished child processes (step 1 runs the aligners as
+                    subprocesses)
+    peak_alloc      peak of memory allocated by Python during the step (tracemalloc)
+    max_rss_kb      maximum resident set size of the process so far in kB (resource.getrusage)
+    entries_in      number of lines in the input files of the step
+    entries_out     number of lines in the output files of the step
+
+If a cProfile directory is given, the profile of each step is dumped to <dir>/step_<n>_<name>.prof, to be
+inspected with pstats or snakeviz. At the end of a run, summary() returns a table of all steps and write_trace()
+writes the records as JSON.
+
+A disabled profiler just calls the step functions.
+
+"""
+
+import os
+import sys
+import json
+import time
+import cProfile
+import resource
+import tracemalloc
+
+# ru_maxrss is in bytes on macOS, in kilobytes on Linux
+RSS_DIVISOR = 1024 if sys.platform == 'darwin' else 1
+
+
+def count_lines(filename):
+    if not os.path.isfile(filename):
+        return None
+    with open(filename, 'rb') as f:
+        return sum(1 for line in f if line.strip())
+
+
+def _total_entries(filenames):
+    counts = [count_lines(filename) for filename in filenames]
+    counts = [c for c in counts if c is not None]
+    return sum(counts) if counts else None
+
+
+class StepProfiler:
+
+    def __init__(self, enabled=False, cprofile_dir=None, memory=True):
+        """
+        :param enabled: if False, run() only calls the step function
+        :param cprofile_dir: if not None, a cProfile dump is written for each step into this directory
+        :param memory: trace the Python memory allocations with tracemalloc (slows the steps down)
+        """
+        self.enabled = enabled
+        self.cprofile_dir = cprofile_dir
+        self.memory = memory
+        self.records = []
+
+    def run(self, step, name, func, *args, inputs=(), outputs=(), **kwargs):
+        """
+        Run func(*args, **kwargs) as processing step number step.
+        :param step: the number of the step
+        :param name: the name of the step in the summary
+        :param inputs: input files of the step, to count the entries in
+        :param outputs: output files of the step, to count the entries out
+        :return: the return value of func
+        """
+        if not self.enabled:
+            return func(*args, **kwargs)
+
+        record = {'step': step, 'name': name, 'function': func.__name__, 'entries_in': _total_entries(inputs)}
+        profile = cProfile.Profile() if self.cprofile_dir else None
+        if self.memory:
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        wall = time.perf_counter()
+        if profile:
+            profile.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if profile:
+                profile.disable()
+            record['wall_s'] = round(time.perf_counter() - wall, 4)
+            usage_after = resource.getrusage(resource.RUSAGE_SELF)
+            children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+            record['cpu_s'] = round(usage_after.ru_utime + usage_after.ru_stime - usage.ru_utime - usage.ru_stime
+                                    + children_after.ru_utime + children_after.ru_stime
+                                    - children.ru_utime - children.ru_stime, 4)
+            if self.memory:
+                record['peak_alloc'] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            record['max_rss_kb'] = usage_after.ru_maxrss // RSS_DIVISOR
+            record['entries_out'] = _total_entries(outputs)
+            if profile:
+                os.makedirs(self.cprofile_dir, exist_ok=True)
+                record['cprofile'] = os.path.join(self.cprofile_dir,
+                                                  'step_' + str(step) + '_' + name.replace(' ', '_') + '.prof')
+                profile.dump_stats(record['cprofile'])
+            self.records.append(record)
+
+    def summary(self):
+        """
+        :return: the lines of a table with the records of all steps run so far
+        """
+        lines = ['{:>4}  {:<32} {:>9} {:>9} {:>11} {:>11} {:>10} {:>10}'.format(
+            'step', 'name', 'wall s', 'cpu s', 'peak MB', 'max rss MB', 'in', 'out')]
+        total_wall = 0.0
+        for rec in self.records:
+            total_wall += rec['wall_s']
+            peak = '{:.1f}'.format(rec['peak_alloc'] / 1e6) if 'peak_alloc' in rec else '-'
+            lines.append('{:>4}  {:<32} {:>9.3f} {:>9.3f} {:>11} {:>11.1f} {:>10} {:>10}'.format(
+                rec['step'], rec['name'], rec['wall_s'], rec['cpu_s'], peak, rec['max_rss_kb'] / 1024,
+                str(rec['entries_in']) if rec['entries_in'] is not None else '-',
+                str(rec['entries_out']) if rec['entries_out'] is not None else '-'))
+        lines.append('{:>4}  {:<32} {:>9.3f}'.format('', 'total', total_wall))
+        return lines
+
+    def write_trace(self, filename):
+        with open(filename, 'w') as f:
+            json.dump({'argv': sys.argv, 'steps': self.records}, f, indent=2)
+
+    def report(self, trace_file=None):
+        """
+        Print the summary table to stderr and write the JSON trace, if the profiler is enabled and
+        any step has been run.
+        """
+        if not self.enabled or not self.records:
+            return
+        print('\n'.join(self.summary()), file=sys.stderr)
+        if trace_file:
+            self.write_trace(trace_file)
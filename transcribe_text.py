@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Transcribes running text, e.g. the sentences of a TTS corpus, with the pronunciation dictionary and g2p.
+
+The input is read in batches of lines, such that memory does not grow with the size of the input. Each line is
+tokenised into words (letter sequences, lowercased and NFC normalised), the word types not seen before are resolved by a
+PronunciationResolver (see pron_service.py): dictionary lookup and compound division in this process, g2p for
+the remaining words in a process pool. The transcripts of the resolved types are kept in an LRU map of at most
+--max_types words, the output lines are written in input order:
+
+    sentence\tt r a n s c r i p t | o f | e a c h | w o r d
+
+Words that can not be transcribed are written as '?'. Throughput (words per second) and the number of word types
+resolved by each source are reported to stderr.
+
+Usage:
+
+    python3 transcribe_text.py --model g2p_model --cache_file g2p_cache.db --jobs 4 < corpus.txt > corpus_transcr.txt
+
+"""
+
+import re
+import sys
+import time
+import unicodedata
+import argparse
+import itertools
+import concurrent.futures
+from collections import OrderedDict
+
+import g2p_decoder
+import pron_service
+
+TOKEN = re.compile(r'[^\W\d_]+')
+UNKNOWN_WORD = '?'
+# number of words sent to a g2p worker at a time
+CHUNK_SIZE = 64
+
+# the resolver of a g2p worker process, see init_worker()
+WORKER_RESOLVER = None
+
+
+def tokenise(line):
+    """
+    :return: the list of words of line, lowercased and NFC normalised like in pron_service.g2p_key()
+    """
+    return [pron_service.g2p_key(token) for token in TOKEN.findall(unicodedata.normalize('NFC', line))]
+
+
+def read_batches(lines, batch_size):
+    """
+    :return: generator of lists of at most batch_size lines, without line endings
+    """
+    lines = iter(lines)
+    while True:
+        batch = [line.rstrip('\n') for line in itertools.islice(lines, batch_size)]
+        if not batch:
+            return
+        yield batch
+
+
+def init_worker(model_file):
+    global WORKER_RESOLVER
+    # the transcripts are converted to the phone set of the lexicon in the main process, after caching them
+    WORKER_RESOLVER = pron_service.PronunciationResolver(None, g2p_decoder.load_decoder(model_file))
+
+
+def decode_words(words):
+    return [WORKER_RESOLVER.decode(word) for word in words]
+
+
+class TextTranscriber:
+
+    def __init__(self, resolver, model_file=None, jobs=1, max_types=1000000, separator=' | '):
+        """
+        :param resolver: a PronunciationResolver, its decoder is used for g2p if jobs is 1
+        :param model_file: the g2p model, loaded by each worker process if jobs > 1
+        :param jobs: number of g2p worker processes, 1 to decode in this process
+        :param max_types: maximum number of word transcripts kept in memory
+        :param separator: separates the transcripts of the words of a line
+        """
+        self.resolver = resolver
+        self.jobs = jobs
+        self.max_types = max_types
+        self.separator = separator
+        self.executor = None
+        if jobs > 1 and resolver.decoder is not None:
+            self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=init_worker,
+                                                                   initargs=(model_file,))
+        self.transcripts = OrderedDict()    # word -> transcript, least recently used first
+        self.lines = 0
+        self.words = 0
+        self.types = 0
+
+    def resolve_types(self, words):
+        """
+        Resolve the words not yet in self.transcripts: dictionary, compounds and g2p cache in this process, the
+        g2p decoding of the remaining words in the process pool.
+        :param words: distinct words
+        :return: a dict word -> transcript for all words, None for words that can not be transcribed
+        """
+        result = {}
+        misses = []
+        for word in words:
+            if word in self.transcripts:
+                self.transcripts.move_to_end(word)
+                result[word] = self.transcripts[word]
+                continue
+            self.types += 1
+            transcr, source = self.resolver.lookup(word)
+            if transcr is None and self.resolver.decoder is not None:
+                transcr = self.resolver.cached(word)
+                if transcr is None:
+                    misses.append(word)
+                    continue
+                transcr = self.resolver.convert(transcr)
+                source = pron_service.G2P
+            result[word] = self.resolver.count(transcr, source)[0]
+            self.transcripts[word] = result[word]
+
+        if misses:
+            self.resolver.decodes += len(misses)
+            if self.executor is None:
+                decoded = [self.resolver.decode(word) for word in misses]
+            else:
+                chunks = [misses[i:i + CHUNK_SIZE] for i in range(0, len(misses), CHUNK_SIZE)]
+                decoded = [transcr for result in self.executor.map(decode_words, chunks) for transcr in result]
+            for word, transcr in zip(misses, decoded):
+                self.resolver.store(word, transcr)
+                result[word] = self.resolver.count(self.resolver.convert(transcr), pron_service.G2P)[0]
+                self.transcripts[word] = result[word]
+
+        while len(self.transcripts) > self.max_types:
+            self.transcripts.popitem(last=False)
+        return result
+
+    def transcribe_batch(self, lines):
+        """
+        :return: the output lines for lines, in the same order
+        """
+        tokens = [tokenise(line) for line in lines]
+        transcripts = self.resolve_types(OrderedDict.fromkeys(word for words in tokens for word in words))
+        result = []
+        for line, words in zip(lines, tokens):
+            self.words += len(words)
+            result.append(line + '\t' + self.separator.join([transcripts[word] or UNKNOWN_WORD for word in words]))
+        self.lines += len(lines)
+        return result
+
+    def transcribe(self, in_file, out_file, batch_size=10000, progress=0):
+        """
+        :param progress: report the throughput to stderr every progress lines, 0 for a report at the end only
+        """
+        start = time.time()
+        next_report = progress
+        reported = -1
+        for batch in read_batches(in_file, batch_size):
+            for line in self.transcribe_batch(batch):
+                out_file.write(line + '\n')
+            if progress and self.lines >= next_report:
+                self.report(time.time() - start)
+                reported = self.lines
+                next_report = self.lines + progress
+        out_file.flush()
+        if reported != self.lines:
+            self.report(time.time() - start)
+
+    def report(self, elapsed):
+        words_per_sec = self.words / elapsed if elapsed > 0 else 0.0
+        print('lines: ' + str(self.lines) + '\twords: ' + str(self.words) + '\ttypes: ' + str(self.types) +
+              '\t' + '{:.1f}'.format(words_per_sec) + ' words/s', file=sys.stderr)
+        counts = self.resolver.counts
+        print('\t'.join(source + ': ' + str(counts[source]) for source in pron_service.SOURCES), file=sys.stderr)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+        self.resolver.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Transcribes running text, one sentence per line',
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--input', type=argparse.FileType('r'), default=sys.stdin, help='Text file')
+    parser.add_argument('--output', type=argparse.FileType('w'), default=sys.stdout, help='Output file')
+    parser.add_argument('--lexicon', default='data/08_final_version/IPD_IPA_clean.csv',
+                        help='Pronunciation dictionary, a tab separated file or a binary lexicon (*.lex)')
+    parser.add_argument('--model', help='Sequitur g2p model for words not in the lexicon, no g2p if not given')
+    parser.add_argument('--cache_file', help='Persistent cache of the g2p transcripts, see g2p_cache.py')
+    parser.add_argument('--phone_map', default='data/00_phonesets/ipa_xsampa.txt',
+                        help='IPA to X-SAMPA symbol map, transcripts of g2p and the compound database are converted '
+                             'to IPA. Set to "" for an X-SAMPA lexicon.')
+    parser.add_argument('--min_confidence', type=float, default=0.0,
+                        help='Use g2p instead of compound transcripts of a lower confidence')
+    parser.add_argument('--jobs', type=int, default=1, help='Number of g2p worker processes')
+    parser.add_argument('--batch_size', type=int, default=10000, help='Number of lines read at a time')
+    parser.add_argument('--max_types', type=int, default=1000000,
+                        help='Maximum number of word transcripts kept in memory')
+    parser.add_argument('--separator', default=' | ', help='Separator of the word transcripts of a line')
+    parser.add_argument('--progress', type=int, default=0, help='Report the throughput every n lines')
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    resolver = pron_service.create_resolver(args.lexicon, args.model, args.cache_file, args.phone_map,
+                                            min_confidence=args.min_confidence)
+    transcriber = TextTranscriber(resolver, args.model, args.jobs, args.max_types, args.separator)
+    try:
+        transcriber.transcribe(args.input, args.output, args.batch_size, args.progress)
+    finally:
+        transcriber.close()
+
+
+if __name__ == '__main__':
+    main()